@@ -1,8 +1,15 @@
 import numpy as np
 import pygame
+from collision import SpatialHash, SweepAndPrune
 from constants import BALKANY_PATH, POLICE_PATH
+from fonts import TEXTS
 from game_objects import Box
+from physics import EnemyBatch
 from pygame.locals import K_DOWN, K_KP0, K_LEFT, K_RIGHT, K_SPACE, K_UP, K_r
+from surfaces import SCALED_SURFACES
+from tilegrid import TileGrid
+
+from assets import ASSETS
 
 
 def speed_func(max_speed, delta_time, time_needed_to_reach_max):
@@ -28,6 +35,50 @@ def falling_speed(gravity_force, delta_time):
 
 
 class Actor:
+    # No __dict__, the tuning values shared by every actor are class attributes
+    # pos and speed stay arrays : the physics work on them as vectors and EnemyBatch swaps them for rows of its arrays
+    __slots__ = (
+        "can_move_left",
+        "can_move_right",
+        "can_move_up",
+        "can_uncrouch",
+        "controllable",
+        "crouched",
+        "debug_mode",
+        "direction",
+        "full_height",
+        "height",
+        "jumping",
+        "life",
+        "movement_speed",
+        "on_ground",
+        "on_screen",
+        "peak_speed",
+        "pos",
+        "seconds_falling",
+        "seconds_moving_left",
+        "seconds_moving_right",
+        "seconds_recovering",
+        "seconds_stopping",
+        "speed",
+        "sprite",
+        "start_pos",
+        "width",
+    )
+
+    # not useful except for rendering an actor as a square of a certain color
+    color = (30, 30, 200)
+    weight = 1
+    jumping_strength = 10
+
+    max_horizontal_speed = 6  # pixels/s
+    max_vertical_speed = 5
+    fallback_speed = 6
+    seconds_to_max_horizontal_speed = 0.5
+    seconds_to_stop = 0.1
+    # Time where the player is uncontrollable after upon taking damage (in seconds)
+    recovery_time = 0.5
+
     def __init__(self, *args):
         """
         Constructor of the Actor class
@@ -36,10 +87,6 @@ class Actor:
         self.width = args[0]
         self.height = args[1]
         self.full_height = args[1]
-        # not useful except for rendering an actor as a square of a certain color
-        self.color = np.array((30, 30, 200))
-        self.weight = 1
-        self.jumping_strength = 10
         self.direction = [None, None]
         self.on_screen = True
         self.life = 1
@@ -60,14 +107,6 @@ class Actor:
         self.crouched = False
         self.controllable = True
 
-        self.max_horizontal_speed = 6  # pixels/s
-        self.max_vertical_speed = 5
-        self.fallback_speed = 6
-        self.seconds_to_max_horizontal_speed = 0.5
-        self.seconds_to_stop = 0.1
-        # Time where the player is uncontrollable after upon taking damage (in seconds)
-        self.recovery_time = 0.5
-
         self.seconds_moving_left = 0
         self.seconds_moving_right = 0
         self.seconds_stopping = 0
@@ -178,31 +217,39 @@ class Actor:
             self.height = 3 * self.height / 2
 
     def draw(self, screen, coords, width, height):
-        screen.blit(pygame.transform.scale(self.sprite, (int(width), int(height))), coords)
+        screen.blit(SCALED_SURFACES.get(self.sprite, (int(width), int(height))), coords)
         if self.debug_mode:
             pygame.draw.rect(screen, (200, 0, 0), pygame.Rect(coords, (width, height)), 2)
             pygame.draw.ellipse(screen, (0, 0, 0), pygame.Rect(coords - (3, 3 - height), (6, 6)), 0)
-            screen.blit(
-                pygame.font.SysFont("Consolas", 12).render("{0}, {1}".format(self.pos, self.speed), False, (0, 0, 0)),
-                coords - (50, 20),
-            )
+            TEXTS.atlas(12, (0, 0, 0)).draw(screen, "{0}, {1}".format(self.pos, self.speed), coords - (50, 20))
 
             if isinstance(self, Player):
                 screen.blit(
-                    pygame.font.SysFont("Consolas", 12).render(
+                    TEXTS.render(
                         "canMoveUp : {0} canMoveLeft : {1} canMoveRight : {2} onGround : {3}".format(
                             self.can_move_up,
                             self.can_move_left,
                             self.can_move_right,
                             self.on_ground,
                         ),
-                        False,
+                        12,
                         (0, 0, 0),
                     ),
                     (200, 20),
                 )
 
     def check_position_collisions(self, game_objects, tile_size):
+        """
+        :param game_objects: list of gameObjects to test or the SpatialHash holding them to only test the nearby ones,
+            or the TileGrid of the level to test the cells the actor touches
+        """
+        if isinstance(game_objects, TileGrid):
+            game_objects.collide(self, tile_size, isinstance(self, Player))
+            return
+
+        if isinstance(game_objects, SpatialHash):
+            game_objects = game_objects.query_actor(self, tile_size)
+
         # Temporary vars in order to make collision detection independent from gameObjects order and improve efficiency
         actor = self
         on_ground = False
@@ -219,64 +266,61 @@ class Actor:
         tmp_pos = actor.pos
 
         for game_obj in game_objects:
-            if game_obj.on_screen:
-                x_collide, y_collide = False, False
-
-                # Check if player and obj overlap on the x direction
-                if (
-                    actor.pos[1] + tmp_speed[1] <= (game_obj.pos[1] + game_obj.height) * tile_size[1]
-                    and actor.pos[1] + tmp_speed[1] + actor.height * tile_size[1] >= game_obj.pos[1] * tile_size[1]
-                ):
-                    x_collide = True
-
-                # Check if player and obj overlap on the y direction
-                if (
-                    actor.pos[0] + tmp_speed[0] < (game_obj.pos[0] + game_obj.width) * tile_size[0]
-                    and actor.pos[0] + tmp_speed[0] + actor.width * tile_size[0] > game_obj.pos[0] * tile_size[0]
-                ):
-                    y_collide = True
-
-                    above = actor.pos[1] >= (game_obj.pos[1] + game_obj.height) * tile_size[1]
-                    below = actor.pos[1] + actor.height * tile_size[1] <= game_obj.pos[1] * tile_size[1]
-
-                    if below:
-                        if actor.crouched:
-                            can_uncrouch = (
-                                actor.pos[1] + actor.full_height * tile_size[1] <= game_obj.pos[1] * tile_size[1]
-                            )
-
-                # If they overlap on both x and y axis they collide
-                if x_collide and y_collide:
-                    # Look where the player is from the object
-                    above = actor.pos[1] >= (game_obj.pos[1] + game_obj.height) * tile_size[1]
-                    below = actor.pos[1] + actor.height * tile_size[1] <= game_obj.pos[1] * tile_size[1]
-                    right = actor.pos[0] >= (game_obj.pos[0] + game_obj.width) * tile_size[0]
-                    left = actor.pos[0] + actor.width * tile_size[0] <= game_obj.pos[0] * tile_size[0]
-
-                    # if the player is on the left it means that he was moving to the right so
-                    # we put him against the object and removes his speed while changing his canMoveRight state
-                    if above:
-                        on_ground = True
-                        tmp_pos[1] = (game_obj.pos[1] + game_obj.height) * tile_size[1]
-                        self.movement_speed[1] = 0
-                    elif below:
-                        can_move_up = False
-                        jumping = False
-                        tmp_pos[1] = (game_obj.pos[1] - actor.height) * tile_size[1]
-                        self.movement_speed[1] = 0
-                        self.speed[1] /= 1.5
-
-                        if isinstance(actor, Player) and isinstance(game_obj, Box) and self.jumping:
-                            game_obj.activate()
-
-                    elif left:
-                        can_move_right = False
-                        tmp_pos[0] = (game_obj.pos[0] - actor.width) * tile_size[0]
-                        self.movement_speed[0] = 0
-                    elif right:
-                        can_move_left = False
-                        tmp_pos[0] = (game_obj.pos[0] + game_obj.width) * tile_size[0]
-                        self.movement_speed[0] = 0
+            x_collide, y_collide = False, False
+
+            # Check if player and obj overlap on the x direction
+            if (
+                actor.pos[1] + tmp_speed[1] <= (game_obj.y + game_obj.height) * tile_size[1]
+                and actor.pos[1] + tmp_speed[1] + actor.height * tile_size[1] >= game_obj.y * tile_size[1]
+            ):
+                x_collide = True
+
+            # Check if player and obj overlap on the y direction
+            if (
+                actor.pos[0] + tmp_speed[0] < (game_obj.x + game_obj.width) * tile_size[0]
+                and actor.pos[0] + tmp_speed[0] + actor.width * tile_size[0] > game_obj.x * tile_size[0]
+            ):
+                y_collide = True
+
+                above = actor.pos[1] >= (game_obj.y + game_obj.height) * tile_size[1]
+                below = actor.pos[1] + actor.height * tile_size[1] <= game_obj.y * tile_size[1]
+
+                if below:
+                    if actor.crouched:
+                        can_uncrouch = actor.pos[1] + actor.full_height * tile_size[1] <= game_obj.y * tile_size[1]
+
+            # If they overlap on both x and y axis they collide
+            if x_collide and y_collide:
+                # Look where the player is from the object
+                above = actor.pos[1] >= (game_obj.y + game_obj.height) * tile_size[1]
+                below = actor.pos[1] + actor.height * tile_size[1] <= game_obj.y * tile_size[1]
+                right = actor.pos[0] >= (game_obj.x + game_obj.width) * tile_size[0]
+                left = actor.pos[0] + actor.width * tile_size[0] <= game_obj.x * tile_size[0]
+
+                # if the player is on the left it means that he was moving to the right so
+                # we put him against the object and removes his speed while changing his canMoveRight state
+                if above:
+                    on_ground = True
+                    tmp_pos[1] = (game_obj.y + game_obj.height) * tile_size[1]
+                    self.movement_speed[1] = 0
+                elif below:
+                    can_move_up = False
+                    jumping = False
+                    tmp_pos[1] = (game_obj.y - actor.height) * tile_size[1]
+                    self.movement_speed[1] = 0
+                    self.speed[1] /= 1.5
+
+                    if isinstance(actor, Player) and isinstance(game_obj, Box) and self.jumping:
+                        game_obj.activate()
+
+                elif left:
+                    can_move_right = False
+                    tmp_pos[0] = (game_obj.x - actor.width) * tile_size[0]
+                    self.movement_speed[0] = 0
+                elif right:
+                    can_move_left = False
+                    tmp_pos[0] = (game_obj.x + game_obj.width) * tile_size[0]
+                    self.movement_speed[0] = 0
 
         self.on_ground = on_ground
         self.can_move_up = can_move_up
@@ -365,11 +409,40 @@ class Actor:
 
                         tested_actor.peak_speed = tested_actor.speed[0]
 
+    def separate(self, other, tile_size):
+        """
+        Pushes two overlapping actors apart along the axis where they overlap the least
+        The actor on top lands on the other one, actors side by side are both pushed by half the overlap
+        """
+        dx = min(self.pos[0] + self.width * tile_size[0], other.pos[0] + other.width * tile_size[0]) - max(
+            self.pos[0], other.pos[0]
+        )
+        dy = min(self.pos[1] + self.height * tile_size[1], other.pos[1] + other.height * tile_size[1]) - max(
+            self.pos[1], other.pos[1]
+        )
+
+        if dx <= 0 or dy <= 0:
+            return
+
+        if dy < dx:
+            upper, lower = (self, other) if self.pos[1] >= other.pos[1] else (other, self)
+            upper.pos[1] = lower.pos[1] + lower.height * tile_size[1]
+            upper.on_ground = True
+            upper.speed[1] = 0
+            upper.seconds_falling = 0
+        else:
+            left, right = (self, other) if self.pos[0] <= other.pos[0] else (other, self)
+            shift = int(np.ceil(dx / 2))
+            left.pos[0] -= shift
+            right.pos[0] += int(np.ceil(dx)) - shift
+
 
 class Player(Actor):
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         super().__init__(args[0], args[1], args[2])
-        self.sprite = pygame.image.load(BALKANY_PATH)
+        self.sprite = ASSETS.get(BALKANY_PATH)
         self.on_screen = True
         self.life = 1
 
@@ -385,9 +458,6 @@ class Player(Actor):
             self.seconds_stopping = 0
             self.move(keys, dt, size_ratio, game_scale)
         else:
-            self.secondsMovingRight = 0
-            self.secondsMovingLeft = 0
-
             if abs(self.speed[0]) < 0.01 and self.direction[0]:
                 self.speed[0] = 0
                 self.seconds_stopping = 0
@@ -425,15 +495,20 @@ class Player(Actor):
         self.check_position_collisions(game_objects, tile_size)
 
         if self.controllable:
+            # The speed changed since the actors were swept, the contacts are looked for with the new one
+            if isinstance(actors, (SweepAndPrune, EnemyBatch)):
+                actors = actors.query_actor(self, tile_size)
             self.actor_collision(actors, tile_size)
 
         self.pos += np.int32(np.round(self.movement_speed))
 
 
 class Enemy(Actor):
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         super().__init__(args[0], args[1], args[2])
-        self.sprite = pygame.image.load(POLICE_PATH)
+        self.sprite = ASSETS.get(POLICE_PATH)
 
         self.life = 1
 
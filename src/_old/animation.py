@@ -1,10 +1,11 @@
 import pygame
 
+from assets import ASSETS
+
 
 class SpriteAnimation:
     def __init__(self, sprite, size, nb_frames=20):
-        self.image = pygame.image.load(sprite)
-        self.image.set_colorkey((255, 255, 255))
+        self.image = ASSETS.get(sprite, (255, 255, 255))
         self.nb_frames = nb_frames
         self.sprite = []
         self.size = size
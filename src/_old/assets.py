@@ -0,0 +1,58 @@
+import pygame
+from pygame.locals import RLEACCEL, SRCALPHA
+
+
+class AssetRegistry:
+    def __init__(self):
+        """
+        Loads every image once and shares the same surface with everything that asks for it
+        Images are converted to the display pixel format when a display mode is set so blits don't convert them again
+        """
+        # (path, colorkey) -> surface
+        self.surfaces = {}
+
+    def load(self, path, colorkey=None):
+        surface = pygame.image.load(path)
+
+        if pygame.display.get_surface() is not None:
+            if surface.get_flags() & SRCALPHA:
+                surface = surface.convert_alpha()
+            else:
+                surface = surface.convert()
+
+        if colorkey is not None:
+            surface.set_colorkey(colorkey, RLEACCEL)
+
+        return surface
+
+    def get(self, path, colorkey=None):
+        """
+        :param path: path of the image, see constants.py
+        :param colorkey: color made transparent when blitting, None to keep the image as is
+        :return: the shared surface, it must not be modified by the caller
+        """
+        key = (path, colorkey)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.load(path, colorkey)
+            self.surfaces[key] = surface
+        return surface
+
+    def preload(self, paths):
+        """
+        Loads the images up front so the game never goes back to the disk while it's running
+        """
+        for path in paths:
+            self.get(path)
+
+    def clear(self):
+        self.surfaces = {}
+
+    def memory_report(self):
+        """
+        :return: dict of the memory used by each loaded image in bytes, keyed by (path, colorkey)
+        """
+        return {key: surface.get_pitch() * surface.get_height() for key, surface in self.surfaces.items()}
+
+
+ASSETS = AssetRegistry()
@@ -0,0 +1,233 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pygame
+from constants import SPRITE_PATHS
+from levels import LEVEL_EXTENSION, RECORD, write_binary_level
+from pygame.locals import K_LEFT, K_RIGHT, K_SPACE
+from world import World
+
+from assets import ASSETS
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Same base size as the window, size_ratio is computed from it
+BASESIZE = (1280, 720)
+
+
+class ScriptedKeys:
+    def __init__(self, pressed=()):
+        """
+        Stands for pygame.key.get_pressed(), indexed by the key constants
+        """
+        self.pressed = frozenset(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+
+def scripted_keys(frame):
+    """
+    Input of the player on each frame : runs right, jumps regularly and goes back left for a while every 600 frames
+    """
+    if 400 <= frame % 600 < 450:
+        pressed = [K_LEFT]
+    else:
+        pressed = [K_RIGHT]
+    if frame % 90 < 10:
+        pressed.append(K_SPACE)
+    return ScriptedKeys(pressed)
+
+
+def synthetic_level(width, enemies, boxes, seed=0):
+    """
+    Builds a level of width tiles : a floor of ground segments separated by small gaps, floating ground and boxes
+    above it and enemies spread along it
+    :return: dict of the RECORD arrays of each object type, like levels.read_binary_level
+    """
+    rng = np.random.default_rng(seed)
+
+    ground = []
+    x = 0
+    while x < width:
+        segment = int(min(rng.integers(8, 40), width - x))
+        ground.append((segment, 2, x, 0))
+        x += segment + int(rng.integers(0, 3))
+    for x in rng.integers(10, max(width - 5, 11), size=width // 25).tolist():
+        ground.append((int(rng.integers(2, 6)), 1, x, int(rng.integers(4, 8))))
+
+    box_x = rng.integers(10, max(width - 1, 11), size=boxes).tolist()
+    enemy_x = rng.integers(15, max(width - 1, 16), size=enemies).tolist()
+
+    return {
+        "P": np.array([(1, 2, 3, 2)], dtype=RECORD),
+        "E": np.array([(1, 1, x, 3) for x in enemy_x], dtype=RECORD),
+        "g": np.array(ground, dtype=RECORD),
+        "b": np.array([(1, 1, x, 5) for x in box_x], dtype=RECORD),
+        "p": np.array([], dtype=RECORD),
+    }
+
+
+def percentiles(values):
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return None
+    return {
+        "mean": float(values.mean()),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(values.max()),
+    }
+
+
+def peak_rss_kb():
+    """
+    :return: peak resident set size of the process in KiB, None where the resource module doesn't exist
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KiB on Linux
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_frame(world, screen, frame, dt, size_ratio):
+    world.update(scripted_keys(frame), dt, size_ratio)
+    world.draw(screen)
+    pygame.display.flip()
+
+
+def run(args):
+    """
+    Runs the frames of the benchmark on a synthetic level then the frames measuring allocations with tracemalloc,
+    which slows everything down so they are not timed
+    :return: dict of the results
+    """
+    width, height = args.size
+    screen = pygame.display.set_mode((width, height))
+    ASSETS.preload(SPRITE_PATHS)
+    tile_size = np.array((width // 48, height // 27))
+    size_ratio = np.array((width, height)) / BASESIZE
+    dt = 1 / args.fps
+
+    with tempfile.TemporaryDirectory() as tmp:
+        level = os.path.join(tmp, "benchmark" + LEVEL_EXTENSION)
+        write_binary_level(level, synthetic_level(args.width, args.enemies, args.boxes, args.seed))
+
+        world = World((width, height), tile_size, 1)
+        if args.stream:
+            world.stream_world(level)
+        else:
+            world.read_world(level)
+        if args.batched:
+            world.switch_batched_enemies()
+        if args.tiles:
+            world.switch_tile_collisions()
+
+        frame = 0
+        for _ in range(args.warmup):
+            run_frame(world, screen, frame, dt, size_ratio)
+            frame += 1
+
+        frame_times = []
+        for _ in range(args.frames):
+            start = time.perf_counter()
+            run_frame(world, screen, frame, dt, size_ratio)
+            frame_times.append((time.perf_counter() - start) * 1000)
+            frame += 1
+
+        allocated = []
+        retained = []
+        tracemalloc.start()
+        for _ in range(args.alloc_frames):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            run_frame(world, screen, frame, dt, size_ratio)
+            current, peak = tracemalloc.get_traced_memory()
+            allocated.append(peak - before)
+            retained.append(current - before)
+            frame += 1
+        tracemalloc.stop()
+
+        objects = len(world.objects)
+        enemies_alive = len(world.actors)
+
+    return {
+        "config": {
+            "level_width": args.width,
+            "enemies": args.enemies,
+            "boxes": args.boxes,
+            "seed": args.seed,
+            "size": [width, height],
+            "fps": args.fps,
+            "stream": args.stream,
+            "batched": args.batched,
+            "tiles": args.tiles,
+            "warmup": args.warmup,
+            "frames": args.frames,
+            "alloc_frames": args.alloc_frames,
+        },
+        "python": sys.version.split()[0],
+        "pygame": pygame.version.ver,
+        "objects": objects,
+        "enemies_alive": enemies_alive,
+        "frame_time_ms": percentiles(frame_times),
+        # Peak of the memory allocated during a frame and what was still allocated at its end
+        "allocated_bytes_per_frame": percentiles(allocated),
+        "retained_bytes_per_frame": percentiles(retained),
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def size(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Runs the game without a display and reports frame times as JSON")
+    parser.add_argument("--width", type=int, default=2000, help="width of the synthetic level in tiles")
+    parser.add_argument("--enemies", type=int, default=100, help="number of enemies in the level")
+    parser.add_argument("--boxes", type=int, default=100, help="number of boxes in the level")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic level")
+    parser.add_argument("--size", type=size, default=BASESIZE, help="size of the screen, WIDTHxHEIGHT")
+    parser.add_argument("--fps", type=int, default=60, help="frame rate simulated, sets the dt of each frame")
+    parser.add_argument("--warmup", type=int, default=60, help="frames run before measuring")
+    parser.add_argument("--frames", type=int, default=600, help="frames timed")
+    parser.add_argument("--alloc-frames", type=int, default=120, help="frames run with tracemalloc after the timing")
+    parser.add_argument("--stream", action="store_true", help="stream the level around the camera")
+    parser.add_argument("--batched", action="store_true", help="run the enemies physics on arrays")
+    parser.add_argument("--tiles", action="store_true", help="collide with the tile grid instead of the objects")
+    parser.add_argument("--output", help="JSON file to write, printed when not given")
+    args = parser.parse_args(argv)
+
+    # No window nor sound device needed, the build boxes have no display
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.init()
+    try:
+        results = run(args)
+    finally:
+        pygame.quit()
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
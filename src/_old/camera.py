@@ -1,7 +1,50 @@
+import math
+
 import numpy as np
 import pygame
 
-CAMERA_TRIGGER = pygame.USEREVENT
+# Camera modes : (frames of the player's speed the camera looks ahead, time constant in seconds of the smoothing)
+CAMERA_MODES = {
+    "dead_zone": (0, 0.0),
+    "look_ahead": (20, 0.15),
+    "smooth": (0, 0.15),
+}
+
+
+def follow_offset(zone, target, speed, lower_bounds, look_ahead=0, smoothing=0.0, dt=0.0):
+    """
+    Moves the dead zone of the camera so the target box stays inside it, the target is only followed right of and
+    above the lower bounds so the camera stops at the start of the level
+    :param zone: (xmin, ymin, xmax, ymax) of the dead zone in pixels
+    :param target: (x, y, width, height) of the followed box in pixels
+    :param speed: (x, y) speed of the target in pixels per frame
+    :param lower_bounds: (x, y) in pixels
+    :param look_ahead: number of frames of its horizontal speed the target is followed ahead of where it is
+    :param smoothing: time constant in seconds of the camera catching up with the target, 0 moves it at once
+    :param dt: duration of the frame in seconds
+    :return: (dx, dy) the zone moves by, in pixels
+    """
+    xmin, ymin, xmax, ymax = zone
+    x, y, width, height = target
+    x += speed[0] * look_ahead
+
+    dx, dy = 0.0, 0.0
+    if lower_bounds[0] < x < xmin:
+        dx = x - xmin
+    elif x + width > xmax:
+        dx = x + width - xmax
+
+    if lower_bounds[1] < y < ymin:
+        dy = y - ymin
+    elif y + height > ymax:
+        dy = y + height - ymax
+
+    if smoothing > 0:
+        # Same share of the distance covered every second whatever the frame rate
+        catch_up = 1 - math.exp(-dt / smoothing)
+        dx *= catch_up
+        dy *= catch_up
+    return dx, dy
 
 
 class Camera:
@@ -27,6 +70,7 @@ class Camera:
         )
 
         self.initialValues = (8, 28, 4, 24, tuple(self.pos), self.triggerBounds)
+        self.set_mode("dead_zone")
 
     def set_pos(self, pos):
         self.pos = np.array(pos)
@@ -47,6 +91,7 @@ class Camera:
         self.ymax = int(self.initialValues[3] * self.tile_size[1] / self.scale)
         self.pos = self.initialValues[4]
         self.triggerBounds = self.initialValues[5]
+        self.rest_x, self.rest_y = 0.0, 0.0
 
     def resize(self, size, case_size):
         self.width = size[0]
@@ -78,27 +123,43 @@ class Camera:
         self.size = np.array(size)
         self.tile_size = case_size
 
-    def check_player_pos(self, player):
-        dx, dy = 0, 0
-        trigger = False
-        tile_size = self.tile_size
-        tmp_speed = np.int32(np.round(player.speed))
-        if (self.initialValues[0] * tile_size[0]) < player.pos[0] + tmp_speed[0] < self.xmin:
-            dx += player.pos[0] + tmp_speed[0] - self.xmin
-            trigger = pygame.USEREVENT
-        elif player.pos[0] + tmp_speed[0] + (player.width * tile_size[0]) > self.xmax:
-            trigger = pygame.USEREVENT
-            dx += player.pos[0] + tmp_speed[0] + (player.width * tile_size[0]) - self.xmax
-
-        if (self.initialValues[2] * tile_size[1]) < player.pos[1] + tmp_speed[1] < self.ymin:
-            dy += player.pos[1] + tmp_speed[1] - self.ymin
-            trigger = pygame.USEREVENT
-        elif player.pos[1] + tmp_speed[1] + (player.height * tile_size[1]) > self.ymax:
-            dy += (player.pos[1] + tmp_speed[1] + player.height * tile_size[1]) - self.ymax
-            trigger = pygame.USEREVENT
-
-        if trigger:
-            pygame.event.post(pygame.event.Event(trigger, {"dx": int(dx), "dy": int(dy)}))
+    def set_mode(self, mode):
+        """
+        :param mode: name of one of the CAMERA_MODES
+        """
+        self.mode = mode
+        self.look_ahead, self.smoothing = CAMERA_MODES[mode]
+        self.rest_x, self.rest_y = 0.0, 0.0
+
+    def cycle_mode(self):
+        modes = list(CAMERA_MODES)
+        self.set_mode(modes[(modes.index(self.mode) + 1) % len(modes)])
+
+    def follow(self, player, dt):
+        """
+        Computes how much the camera moves to follow the player once it has moved, the fractions of pixels the
+        smoothing gives are kept for the next frames
+        :return: (dx, dy) whole pixels the camera and the world origin have to move by
+        """
+        dx, dy = follow_offset(
+            (self.xmin, self.ymin, self.xmax, self.ymax),
+            (
+                float(player.pos[0]),
+                float(player.pos[1]),
+                player.width * self.tile_size[0],
+                player.height * self.tile_size[1],
+            ),
+            (float(player.movement_speed[0]), float(player.movement_speed[1])),
+            (self.initialValues[0] * self.tile_size[0], self.initialValues[2] * self.tile_size[1]),
+            self.look_ahead,
+            self.smoothing,
+            dt,
+        )
+        dx += self.rest_x
+        dy += self.rest_y
+        move_x, move_y = int(dx), int(dy)
+        self.rest_x, self.rest_y = dx - move_x, dy - move_y
+        return move_x, move_y
 
     def move(self, dx, dy):
         self.xmin += dx
@@ -0,0 +1,395 @@
+import bisect
+import math
+
+import numpy as np
+
+
+class SpatialHash:
+    def __init__(self, cell_size=4):
+        """
+        Uniform grid used as a broadphase for static game objects
+        Cells are keyed by (x, y) and counted in tiles so the grid doesn't need to be rebuilt when the window is resized
+        Objects are stored by insertion index so queries return them in the same order as World.game_objects
+        :param cell_size: width and height of a cell in tiles
+        """
+        self.cell_size = cell_size
+        self.cells = {}
+        # Removed objects leave a None in the list so the indices of the others don't change
+        self.objects = []
+        self.indices = {}
+        self.min_row = 0
+        self.max_row = 0
+        # Sorted copies of the cells used by the vectorized queries, built on demand
+        self.cell_keys = None
+        self.cell_objects = None
+        self.rects = None
+
+    def clear(self):
+        self.cells = {}
+        self.objects = []
+        self.indices = {}
+        self.min_row = 0
+        self.max_row = 0
+        self.cell_keys = None
+        self.cell_objects = None
+        self.rects = None
+
+    def cell_range(self, xmin, ymin, xmax, ymax):
+        """
+        :return: the cells (in cell coordinates) covered by the area in tiles, edges included
+        """
+        return (
+            math.floor(xmin / self.cell_size),
+            math.floor(ymin / self.cell_size),
+            math.floor(xmax / self.cell_size),
+            math.floor(ymax / self.cell_size),
+        )
+
+    def insert(self, game_obj):
+        """
+        Adds the gameObject to every cell it covers. The right and top edges are included because
+        collisions also trigger when an actor only touches an object
+        :param game_obj: object with pos, width and height counted in tiles
+        """
+        index = len(self.objects)
+        first = not self.indices
+        self.objects.append(game_obj)
+        self.indices[game_obj] = index
+        self.cell_keys = None
+        cx0, cy0, cx1, cy1 = self.cell_range(
+            game_obj.x, game_obj.y, game_obj.x + game_obj.width, game_obj.y + game_obj.height
+        )
+
+        if first:
+            self.min_row, self.max_row = cy0, cy1
+        else:
+            self.min_row = min(self.min_row, cy0)
+            self.max_row = max(self.max_row, cy1)
+
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                self.cells.setdefault((cx, cy), []).append(index)
+
+    def remove(self, game_obj):
+        """
+        Removes the gameObject from its cells, the list of objects is packed again once half of it is empty
+        """
+        index = self.indices.pop(game_obj, None)
+        if index is None:
+            return
+
+        self.objects[index] = None
+        self.cell_keys = None
+        cx0, cy0, cx1, cy1 = self.cell_range(
+            game_obj.x, game_obj.y, game_obj.x + game_obj.width, game_obj.y + game_obj.height
+        )
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                cell = self.cells[(cx, cy)]
+                cell.remove(index)
+                if not cell:
+                    del self.cells[(cx, cy)]
+
+        if len(self.indices) < len(self.objects) // 2:
+            objects = [obj for obj in self.objects if obj is not None]
+            self.clear()
+            for obj in objects:
+                self.insert(obj)
+
+    def query(self, xmin, ymin, xmax, ymax):
+        """
+        Retrieve the objects that may overlap the area
+        :param xmin, ymin, xmax, ymax: area in tiles, ymin and ymax can be None to query the whole column
+        :return: list of candidates in insertion order, without duplicates
+        """
+        if not self.objects:
+            return []
+
+        cx0, cy0, cx1, cy1 = self.cell_range(
+            xmin,
+            self.min_row * self.cell_size if ymin is None else ymin,
+            xmax,
+            self.max_row * self.cell_size if ymax is None else ymax,
+        )
+        cy0 = max(cy0, self.min_row)
+        cy1 = min(cy1, self.max_row)
+
+        found = set()
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                indices = self.cells.get((cx, cy))
+                if indices:
+                    found.update(indices)
+
+        return [self.objects[i] for i in sorted(found)]
+
+    def cell_key(self, cx, cy):
+        """
+        Packs cell coordinates into a single integer, rows are clipped to the ones holding objects
+        """
+        return cx * (self.max_row - self.min_row + 1) + (cy - self.min_row)
+
+    def build_arrays(self):
+        """
+        Flattens the cells into arrays sorted by cell key and stores the objects rects (x, y, width, height in tiles)
+        """
+        keys = []
+        indices = []
+        for (cx, cy), cell in self.cells.items():
+            keys.extend([self.cell_key(cx, cy)] * len(cell))
+            indices.extend(cell)
+
+        keys = np.array(keys, dtype=np.int64)
+        indices = np.array(indices, dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        self.cell_keys = keys[order]
+        self.cell_objects = indices[order]
+        self.rects = np.array(
+            [(0, 0, 0, 0) if obj is None else (obj.x, obj.y, obj.width, obj.height) for obj in self.objects],
+            dtype=float,
+        ).reshape(-1, 4)
+
+    def query_boxes(self, xmin, ymin, xmax, ymax):
+        """
+        Vectorized version of query for many areas at once
+        :param xmin, ymin, xmax, ymax: arrays of areas in tiles
+        :return: (box_indices, object_indices) arrays of candidate pairs sorted by box then by object
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        if not self.objects or len(xmin) == 0:
+            return empty, empty
+
+        if self.cell_keys is None:
+            self.build_arrays()
+
+        cx0 = np.floor(np.asarray(xmin) / self.cell_size).astype(np.int64)
+        cx1 = np.floor(np.asarray(xmax) / self.cell_size).astype(np.int64)
+        cy0 = np.maximum(np.floor(np.asarray(ymin) / self.cell_size).astype(np.int64), self.min_row)
+        cy1 = np.minimum(np.floor(np.asarray(ymax) / self.cell_size).astype(np.int64), self.max_row)
+        span_x = cx1 - cx0 + 1
+        span_y = cy1 - cy0 + 1
+
+        boxes = []
+        keys = []
+        box_ids = np.arange(len(cx0))
+        for dx in range(int(span_x.max())):
+            for dy in range(max(int(span_y.max()), 0)):
+                valid = (dx < span_x) & (dy < span_y)
+                boxes.append(box_ids[valid])
+                keys.append(self.cell_key(cx0[valid] + dx, cy0[valid] + dy))
+
+        if not boxes:
+            return empty, empty
+
+        boxes = np.concatenate(boxes)
+        keys = np.concatenate(keys)
+        start = np.searchsorted(self.cell_keys, keys, side="left")
+        counts = np.searchsorted(self.cell_keys, keys, side="right") - start
+        total = int(counts.sum())
+        if total == 0:
+            return empty, empty
+
+        # Expands every [start, start + count) range of the sorted cells into one flat array of positions
+        positions = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(start, counts)
+        pairs = np.unique(np.repeat(boxes, counts) * len(self.objects) + self.cell_objects[positions])
+
+        return pairs // len(self.objects), pairs % len(self.objects)
+
+    def query_actor(self, actor, tile_size):
+        """
+        Retrieve the objects an actor may collide with during its next move
+
+        The swept area goes from the actor's position to twice its rounded speed because
+        Actor.check_position_collisions snaps the actor between pos and pos + speed while iterating,
+        and tests the following objects from that new position
+        Crouched actors also look at their whole column to know if they can stand up
+        """
+        speed = (round(actor.speed[0]), round(actor.speed[1]))
+        xmin = min(actor.pos[0], actor.pos[0] + 2 * speed[0])
+        xmax = max(actor.pos[0], actor.pos[0] + 2 * speed[0]) + actor.width * tile_size[0]
+        ymin = min(actor.pos[1], actor.pos[1] + 2 * speed[1])
+        ymax = max(actor.pos[1], actor.pos[1] + 2 * speed[1]) + actor.height * tile_size[1]
+
+        if actor.crouched:
+            return self.query(xmin / tile_size[0], None, xmax / tile_size[0], None)
+
+        return self.query(xmin / tile_size[0], ymin / tile_size[1], xmax / tile_size[0], ymax / tile_size[1])
+
+
+class XIndex:
+    def __init__(self):
+        """
+        Static game objects sorted by their left edge, with the running maximum of their right edges, so the
+        objects crossing a range of x are found with two binary searches instead of testing every object
+        Sorted again on the first query after objects were added or removed
+        """
+        self.objects = []
+        self.starts = []
+        self.ends = np.zeros(0)
+        self.max_ends = []
+        self.dirty = False
+        # Increased on every rebuild so users can tell the objects changed
+        self.version = 0
+
+    def clear(self):
+        self.objects = []
+        self.dirty = True
+
+    def add(self, game_obj):
+        self.objects.append(game_obj)
+        self.dirty = True
+
+    def remove(self, game_obj):
+        """
+        Takes the object out of the sorted lists when they are up to date, so removing objects between queries
+        doesn't sort them again
+        """
+        if self.dirty:
+            self.objects.remove(game_obj)
+            return
+
+        i = bisect.bisect_left(self.starts, game_obj.x)
+        while self.objects[i] is not game_obj:
+            i += 1
+        del self.objects[i]
+        del self.starts[i]
+        self.ends = np.delete(self.ends, i)
+        # Only the running maximum from the removed object changes
+        previous = self.max_ends[i - 1] if i else -np.inf
+        self.max_ends[i:] = np.maximum(np.maximum.accumulate(self.ends[i:]), previous).tolist()
+        self.version += 1
+
+    def build(self):
+        self.objects.sort(key=lambda game_obj: game_obj.x)
+        starts = np.array([game_obj.x for game_obj in self.objects], dtype=np.float64)
+        self.ends = starts + np.array([game_obj.width for game_obj in self.objects], dtype=np.float64)
+        self.starts = starts.tolist()
+        self.max_ends = np.maximum.accumulate(self.ends).tolist() if len(self.objects) else []
+        self.dirty = False
+        self.version += 1
+
+    def query(self, xmin, xmax):
+        """
+        :return: the objects with xmin < right edge and left edge < xmax (in tiles), sorted by left edge
+        """
+        if self.dirty:
+            self.build()
+
+        # Objects before first all end before xmin, the ones from last start after xmax
+        first = bisect.bisect_right(self.max_ends, xmin)
+        last = bisect.bisect_left(self.starts, xmax)
+        if first >= last:
+            return []
+
+        # A long object can keep max_ends above xmin while shorter ones after it already ended
+        hits = np.flatnonzero(self.ends[first:last] > xmin) + first
+        return [self.objects[i] for i in hits.tolist()]
+
+
+class SweepAndPrune:
+    def __init__(self):
+        """
+        Broadphase for actor vs actor contacts
+        Actors are kept sorted on the left edge of their swept box, the list is sorted again each frame and stays
+        almost sorted because actors barely move between two frames
+        """
+        self.actors = []
+        self.bounds = {}
+        self.order = {}
+        self.count = 0
+        # Left edges of the sorted actors
+        self.starts = []
+
+    def clear(self):
+        self.actors = []
+        self.bounds = {}
+        self.order = {}
+        self.count = 0
+        self.starts = []
+
+    def add(self, actor):
+        self.actors.append(actor)
+        self.bounds[actor] = (0, 0, 0, 0)
+        self.order[actor] = self.count
+        self.count += 1
+
+    def remove(self, actor):
+        if actor in self.order:
+            self.actors.remove(actor)
+            del self.bounds[actor]
+            del self.order[actor]
+
+    def remove_all(self, actors):
+        """
+        Removes a set of actors with a single pass over the sorted list
+        """
+        self.actors = [actor for actor in self.actors if actor not in actors]
+        for actor in actors:
+            self.bounds.pop(actor, None)
+            self.order.pop(actor, None)
+
+    def update(self, tile_size):
+        """
+        Computes the box swept by each actor between its position and its next one, then sorts them on x
+        """
+        bounds = self.bounds
+        for actor in self.actors:
+            bounds[actor] = self.swept_bounds(actor, tile_size)
+
+        # Timsort runs in linear time on the almost sorted list of a frame and stays O(n log n) when the actors
+        # come in file order after a load
+        actors = self.actors
+        actors.sort(key=lambda actor: bounds[actor][0])
+
+        self.starts = [bounds[actor][0] for actor in actors]
+
+    def swept_bounds(self, actor, tile_size):
+        """
+        :return: (xmin, ymin, xmax, ymax) of the box swept by the actor between its position and its next one
+        """
+        x, y = actor.pos[0], actor.pos[1]
+        next_x, next_y = x + actor.speed[0], y + actor.speed[1]
+        return (
+            min(x, next_x),
+            min(y, next_y),
+            max(x, next_x) + actor.width * tile_size[0],
+            max(y, next_y) + actor.height * tile_size[1],
+        )
+
+    def pairs(self):
+        """
+        Sweeps the sorted actors along x and keeps the pairs whose boxes also overlap along y
+        Edges touching count as overlapping like in Actor.actor_collision
+        :return: list of (actor, actor) tuples, each tuple ordered by the insertion order of the actors
+        """
+        bounds = self.bounds
+        order = self.order
+        pairs = []
+        active = []
+
+        for actor in self.actors:
+            x0, y0, _, y1 = bounds[actor]
+            active = [other for other in active if bounds[other][2] >= x0]
+            for other in active:
+                other_bounds = bounds[other]
+                if other_bounds[1] <= y1 and y0 <= other_bounds[3]:
+                    pairs.append((other, actor) if order[other] < order[actor] else (actor, other))
+            active.append(actor)
+
+        return pairs
+
+    def query_actor(self, actor, tile_size):
+        """
+        Retrieve the actors the given one may touch from its current position and speed, the others keep the boxes
+        of the last update. Used by the player once its speed changed since the update
+        :return: the actors whose boxes overlap the one swept by the actor, in insertion order
+        """
+        x0, y0, x1, y1 = self.swept_bounds(actor, tile_size)
+        bounds = self.bounds
+        contacts = []
+        for other in self.actors[: bisect.bisect_right(self.starts, x1)]:
+            other_bounds = bounds[other]
+            if other is not actor and other_bounds[2] >= x0 and other_bounds[1] <= y1 and y0 <= other_bounds[3]:
+                contacts.append(other)
+        contacts.sort(key=self.order.__getitem__)
+        return contacts
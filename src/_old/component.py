@@ -1,7 +1,10 @@
 import numpy as np
 import pygame
+from fonts import FONTS
 from pygame.locals import NOEVENT, USEREVENT
 
+from assets import ASSETS
+
 # Event type used by pygame
 GAME_EVENT = USEREVENT + 1
 MENU_EVENT = USEREVENT + 2
@@ -9,6 +12,8 @@ EDITOR_EVENT = USEREVENT + 3
 
 
 class Component:
+    __slots__ = ("children", "content", "event_id", "event_type", "height", "parent", "width", "x", "y")
+
     def __init__(self, parent, width=None, height=None, content=None, pos=None):
         self.width = width
         self.height = height
@@ -19,6 +24,29 @@ class Component:
         self.children = []
         self.parent = parent
 
+    @property
+    def pos(self):
+        return self.x, self.y
+
+    @pos.setter
+    def pos(self, pos):
+        if pos is None:
+            self.x, self.y = None, None
+        else:
+            self.x, self.y = pos
+
+    def rect(self):
+        return pygame.Rect(self.x, self.y, self.width, self.height)
+
+    def add_dirty_rect(self, rect):
+        self.parent.add_dirty_rect(rect)
+
+    def mark_dirty(self):
+        """
+        Reports the area of the component to its overlay so it's drawn again, to call when its content changes
+        """
+        self.add_dirty_rect(self.rect())
+
     def throw_event(self):
         pygame.event.post(pygame.event.Event(self.event_type, {"id": self.event_id}))
 
@@ -29,8 +57,8 @@ class Component:
             self.content = pygame.Surface((width, height)).convert_alpha()
 
     def move(self, dx, dy):
-        self.pos[0] += dx
-        self.pos[1] += dy
+        self.x += dx
+        self.y += dy
         for child in self.children:
             child.move(dx, dy)
 
@@ -51,20 +79,19 @@ class Component:
 
     def add_child(self, component):
         if isinstance(component, Component):
-            component.pos = [
-                self.pos[0] + component.pos[0],
-                self.pos[1] + component.pos[1],
-            ]
+            component.pos = (self.x + component.x, self.y + component.y)
             self.children.append(component)
 
 
 class Button(Component):
+    __slots__ = ()
+
     def __init__(self, parent, width, height, content, event_id, pos, **kwargs):
         super().__init__(
             parent,
             width,
             height,
-            pygame.transform.scale(pygame.image.load(content), (width, height)),
+            pygame.transform.scale(ASSETS.get(content), (width, height)),
         )
 
         self.event_id = event_id
@@ -86,17 +113,21 @@ class Button(Component):
 
 
 class Image(Component):
+    __slots__ = ()
+
     def __init__(self, parent, width, height, pos, content):
         super().__init__(
             parent,
             width,
             height,
-            pygame.transform.scale(pygame.image.load(content), (width, height)),
+            pygame.transform.scale(ASSETS.get(content), (width, height)),
             pos,
         )
 
 
 class Text(Component):
+    __slots__ = ()
+
     def __init__(
         self,
         parent,
@@ -108,7 +139,7 @@ class Text(Component):
     ):
         super().__init__(parent)
 
-        self.content = pygame.font.SysFont("Consolas", size).render(kwargs["content"], False, color)
+        self.content = FONTS.get(size).render(kwargs["content"], False, color)
         self.width = self.content.get_width()
         self.height = self.content.get_height()
         self.pos = pos
@@ -121,6 +152,8 @@ class Text(Component):
 
 
 class Background(Component):
+    __slots__ = ("color",)
+
     def __init__(self, parent, width, height, color=(0, 0, 0, 150)):
         super().__init__(parent, width, height, pos=[0, 0])
         if len(color) == 4:
@@ -12,3 +12,17 @@ BALKANY_PATH = os.path.join(os.curdir, "src", "assets", "balkany.png")
 POLICE_PATH = os.path.join(os.curdir, "src", "assets", "police.jpg")
 TEST_BUTTON_PATH = os.path.join(os.curdir, "src", "assets", "testButton.png")
 WORLDS_PATH = os.path.join(os.curdir, "src", "worlds")
+
+# Every image loaded by the game, preloaded by the asset registry
+SPRITE_PATHS = (
+    TEST_BUTTON_PATH,
+    TOP_GROUND_PATH,
+    LOW_GROUND_PATH,
+    SIDE_TOP_GROUND_LEFT_PATH,
+    SIDE_TOP_GROUND_RIGHT_PATH,
+    BOTH_SIDE_TOP_GROUND_PATH,
+    BLOCK_PATH,
+    BROKEN_BLOCK_PATH,
+    BALKANY_PATH,
+    POLICE_PATH,
+)
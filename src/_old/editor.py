@@ -1,20 +1,54 @@
 import os
-import re
 
 import numpy as np
 import pygame
+from actors import Player
+from constants import WORLDS_PATH
+from fonts import TEXTS
+from game_objects import Box, Ground
 from overlay import EditorMenu, EditorPauseMenu
+from pygame.locals import RLEACCEL
 from world import World
 
 # Editing modes
 PLACE_MODE = 0
 REMOVE_MODE = 1
 
+GRID_COLOR = (70, 70, 70)
+# Color filling the grid surface between the lines, made transparent when blitting it
+GRID_COLORKEY = (255, 0, 255)
+
 # Object types of the game
 GROUND_TYPE = 0
 BLOCK_TYPE = 1
 PLAYER_TYPE = 2
 
+# Cells of the edited grid, the code of a cell is its index in CELL_TYPES which holds its type in the .wd format
+CELL_TYPES = (".", "g", "b", "P")
+EMPTY_CELL = 0
+GROUND_CELL = 1
+BOX_CELL = 2
+PLAYER_CELL = 3
+
+# Cells turned into objects of the world, boxes are never merged with their neighbours
+MERGED_CELLS = (GROUND_CELL,)
+OBJECT_CELLS = (GROUND_CELL, BOX_CELL)
+# Cells there is only one of in the grid
+UNIQUE_CELLS = (PLAYER_CELL,)
+
+
+class EditedObject:
+    def __init__(self, x0, x1, y0, y1, cell, obj):
+        """
+        Object of the edited world covering the same run of cells [x0, x1] on the lines y0 to y1
+        """
+        self.x0 = x0
+        self.x1 = x1
+        self.y0 = y0
+        self.y1 = y1
+        self.cell = cell
+        self.obj = obj
+
 
 class Editor:
     def __init__(self, window_size, tile_size, game_scale):
@@ -22,11 +56,15 @@ class Editor:
         self.world_size = [200, 50]
 
         self.tmp_world = self.generate_empty_world()
+        # Unique cell -> (x, y) of its lowest cell in tmpWorld
+        self.unique_cells = {}
+        # (y, x0, x1, cell) -> EditedObject, for each line of each object in the world
+        self.edited_objects = {}
 
         num = 1
-        while os.path.exists(r"worlds/newWorld{}.w".format(num)):
+        while os.path.exists(os.path.join(WORLDS_PATH, "newWorld{}.w".format(num))):
             num += 1
-        self.world_file = r"worlds/newWorld{}.w".format(num)
+        self.world_file = os.path.join(WORLDS_PATH, "newWorld{}.w".format(num))
 
         self.window_size = window_size
         self.tile_size = tile_size
@@ -44,6 +82,10 @@ class Editor:
 
         self.debug_mode = False
 
+        # Pre-rendered grid and the (tile width, tile height, screen size) it was rendered for
+        self.grid_surface = None
+        self.grid_key = None
+
     def move(self, dx, dy):
         """
         Change the location of where we are moving in the level we are editing and also moves the "game's view" not to keep everything loaded
@@ -72,7 +114,7 @@ class Editor:
     def draw_overlay(self, screen):
         self.overlay.draw(screen)
         screen.blit(
-            pygame.font.SysFont("Consolas", 18, True).render("Mode : {}".format(self.mode), False, (50, 50, 50)),
+            TEXTS.render("Mode : {}".format(self.mode), 18, (50, 50, 50), bold=True),
             [10, 20],
         )
 
@@ -86,24 +128,35 @@ class Editor:
         offset[0] = self.world_origin[0] % self.tile_size[0]
         offset[1] = (self.world_origin[1] - self.window_size[1]) % self.tile_size[1]
 
-        for c in range((screen.get_width() // self.tile_size[0]) + 1):
-            pygame.draw.line(
-                screen,
-                (70, 70, 70),
-                [self.tile_size[0] * c - offset[0], 0],
-                [self.tile_size[0] * c - offset[0], self.window_size[1]],
-            )
-
-        for line in range((screen.get_height() // self.tile_size[1]) + 2):
-            pygame.draw.line(
-                screen,
-                (70, 70, 70),
-                [0, self.window_size[1] + offset[1] - (self.tile_size[0] * line)],
-                [
-                    self.window_size[0],
-                    self.window_size[1] + offset[1] - (self.tile_size[0] * line),
-                ],
-            )
+        # The grid repeats every tile so the same surface is blitted with an offset lower than a tile
+        grid = self.game_grid(screen.get_size())
+        screen.blit(grid, (-offset[0], (self.window_size[1] + offset[1]) % self.tile_size[1] - self.tile_size[1]))
+
+    def game_grid(self, screen_size):
+        """
+        :return: the lines of the grid pre-rendered on a surface one tile larger than the screen, rendered again
+        only when the size of the tiles or of the screen changes
+        """
+        tile_width, tile_height = int(self.tile_size[0]), int(self.tile_size[1])
+        key = (tile_width, tile_height, screen_size)
+        if key == self.grid_key:
+            return self.grid_surface
+
+        width, height = screen_size[0] + tile_width, screen_size[1] + tile_height
+        grid = pygame.Surface((width, height))
+        if pygame.display.get_surface() is not None:
+            grid = grid.convert()
+        grid.fill(GRID_COLORKEY)
+
+        for x in range(0, width, tile_width):
+            pygame.draw.line(grid, GRID_COLOR, [x, 0], [x, height])
+        for y in range(0, height, tile_height):
+            pygame.draw.line(grid, GRID_COLOR, [0, y], [width, y])
+
+        grid.set_colorkey(GRID_COLORKEY, RLEACCEL)
+        self.grid_surface = grid
+        self.grid_key = key
+        return grid
 
     def check_click_pos(self, pos):
         """
@@ -122,43 +175,133 @@ class Editor:
 
     def place(self, pos):
         """
-        Updates the tmpWorld created and reads it to update the world displayed
+        Updates the tmpWorld created and the objects of the world displayed around the tile, the level is only
+        written to the disk by save
         :param pos: The coordinates of the tile we click on (x, y)
         :return:
         """
-        tile_pos = self.check_click_pos(pos)
-        world = self.tmp_world
+        x, y = self.check_click_pos(pos)
+        if not (0 <= x < self.world_size[0] and 0 <= y < self.world_size[1]):
+            return
+
         if self.mode == PLACE_MODE:
             if self.type == GROUND_TYPE:
-                world[tile_pos[1]][tile_pos[0]] = "g"
+                self.set_cell(x, y, GROUND_CELL)
 
             elif self.type == BLOCK_TYPE:
-                world[tile_pos[1]][tile_pos[0]] = "b"
+                self.set_cell(x, y, BOX_CELL)
 
-            elif self.type == PLAYER_TYPE and tile_pos[1] < self.world_size[1]:
-                if self.world.player is not None:
-                    for line in range(len(world)):
-                        if "P" in world[line]:
-                            world[line][world[line].index("P")] = "."
-                    self.world.player = None
-
-                world[tile_pos[1]][tile_pos[0]] = "P"
-                world[tile_pos[1] + 1][tile_pos[0]] = "P"
+            elif self.type == PLAYER_TYPE and y + 1 < self.world_size[1]:
+                self.remove_player()
+                self.set_cell(x, y, PLAYER_CELL)
+                self.set_cell(x, y + 1, PLAYER_CELL)
+                self.unique_cells[PLAYER_CELL] = (x, y)
+                self.world.add_actor(Player(1, 2, np.array((x, y)) * self.tile_size))
 
         if self.mode == REMOVE_MODE:
-            if world[tile_pos[1]][tile_pos[0]] == "P":
-                if tile_pos[1] > 0:
-                    if world[tile_pos[1] - 1][tile_pos[0]] == "P":
-                        world[tile_pos[1] - 1][tile_pos[0]] = "."
+            if self.tmp_world[y, x] == PLAYER_CELL:
+                self.remove_player()
+
+            self.set_cell(x, y, EMPTY_CELL)
 
-                if tile_pos[1] < self.world_size[1] - 1:
-                    if world[tile_pos[1] + 1][tile_pos[0]] == "P":
-                        world[tile_pos[1] + 1][tile_pos[0]] = "."
+    def remove_player(self):
+        """
+        Empties the cells of the player, found with the unique cells index instead of searching the grid, the ones
+        painted over since it was placed are kept
+        """
+        pos = self.unique_cells.pop(PLAYER_CELL, None)
+        if pos is not None:
+            x, y = pos
+            for line in (y, y + 1):
+                if self.tmp_world[line, x] == PLAYER_CELL:
+                    self.set_cell(x, line, EMPTY_CELL)
 
-            world[tile_pos[1]][tile_pos[0]] = "."
+        if self.world.player is not None:
+            self.world.remove_actor(self.world.player)
 
+    def save(self):
+        """
+        Writes the edited level to the world file
+        """
         self.render_world()
-        self.read_world(self.world_file)
+
+    def run_at(self, x, y):
+        """
+        :return: (x0, x1, cell) the run of identical cells around (x, y) on its line, a box is a run on its own
+        """
+        line = self.tmp_world[y]
+        cell = int(line[x])
+        x0 = x1 = x
+        if cell in MERGED_CELLS:
+            different = np.flatnonzero(line[:x] != cell)
+            x0 = int(different[-1]) + 1 if len(different) else 0
+            different = np.flatnonzero(line[x + 1 :] != cell)
+            x1 = x + int(different[0]) if len(different) else len(line) - 1
+        return x0, x1, cell
+
+    def add_edited_object(self, x0, x1, y0, y1, cell):
+        if cell == BOX_CELL:
+            obj = Box(1, 1, (x0, y0))
+            self.world.add_box(obj)
+        else:
+            obj = Ground(x1 - x0 + 1, y1 - y0 + 1, (x0, y0))
+            self.world.add_game_object(obj)
+
+        edited = EditedObject(x0, x1, y0, y1, cell, obj)
+        for y in range(y0, y1 + 1):
+            self.edited_objects[(y, x0, x1, cell)] = edited
+
+    def remove_edited_object(self, edited):
+        for y in range(edited.y0, edited.y1 + 1):
+            del self.edited_objects[(y, edited.x0, edited.x1, edited.cell)]
+        self.world.remove_game_object(edited.obj)
+
+    def set_cell(self, x, y, cell):
+        """
+        Changes a cell of the tmpWorld and replaces the objects of the world covering the runs that changed
+        around it. The world is made of the maximal stacks of identical runs on consecutive lines, so only the
+        objects of the line touching x-1..x+1 and the ones stacked right above and below them are rebuilt
+        """
+        line = self.tmp_world[y]
+        if line[x] == cell:
+            return
+
+        neighbours = [col for col in (x - 1, x, x + 1) if 0 <= col < len(line)]
+
+        # Runs replaced : the one of the cell and the ones the new cell merges with
+        changed = {self.run_at(x, y)}
+        if cell in MERGED_CELLS:
+            changed.update(self.run_at(col, y) for col in neighbours if line[col] == cell)
+
+        for x0, x1, old_cell in changed:
+            edited = self.edited_objects.get((y, x0, x1, old_cell))
+            if edited is None:
+                continue
+            # What is left above and below the line still are maximal stacks
+            self.remove_edited_object(edited)
+            if edited.y0 < y:
+                self.add_edited_object(x0, x1, edited.y0, y - 1, old_cell)
+            if edited.y1 > y:
+                self.add_edited_object(x0, x1, y + 1, edited.y1, old_cell)
+
+        line[x] = cell
+
+        for x0, x1, new_cell in {self.run_at(col, y) for col in neighbours}:
+            if new_cell not in OBJECT_CELLS or (y, x0, x1, new_cell) in self.edited_objects:
+                continue
+
+            y0 = y1 = y
+            if new_cell in MERGED_CELLS:
+                below = self.edited_objects.get((y - 1, x0, x1, new_cell))
+                if below is not None:
+                    self.remove_edited_object(below)
+                    y0 = below.y0
+                above = self.edited_objects.get((y + 1, x0, x1, new_cell))
+                if above is not None:
+                    self.remove_edited_object(above)
+                    y1 = above.y1
+
+            self.add_edited_object(x0, x1, y0, y1, new_cell)
 
     def change_type(self, type):
         self.type = type
@@ -174,17 +317,14 @@ class Editor:
         self.world_file = name
 
     def generate_empty_world(self):
-        world = []
-        for line in range(self.world_size[1]):
-            tmp = []
-            for col in range(self.world_size[0]):
-                tmp += "."
-            world.append(tmp)
-        return world
+        """
+        :return: grid of the codes of the cells, indexed by [y, x]
+        """
+        return np.full((self.world_size[1], self.world_size[0]), EMPTY_CELL, dtype=np.uint8)
 
     def render_world(self):
         """
-        Reads from a world of this shape :
+        Reads from a world of this shape (with the codes of CELL_TYPES in place of the letters) :
         [". g g g g . . . . . . . . . . . . . . . . ",
          ". g g g g . . . . . . . . . . . . . . . . ",
          ". . . . . . b b b b b . . . . . . . . . . ",
@@ -199,104 +339,58 @@ class Editor:
         b 1 1 7 2
         ...
 
+        Each line is cut in runs of identical cells (a box is always a run on its own), then the same runs on
+        consecutive lines are stacked into maximal rectangles, the same ones the editor keeps in the world
         :return:
         """
-        w = self.tmp_world
-
-        flattened_world = []
-        flattened_world_x = []
-
-        for line in w:
-            obj_type = line[0]
-            start_pos = 0
-            count = 0
-            tmp = []
-
-            for col in range(1, len(line)):
-                if obj_type == line[col] and obj_type != "b":
-                    count += 1
-                else:
-                    if obj_type != ".":
-                        tmp.append(str(start_pos) + ";" + str(start_pos + count) + ";" + obj_type)
-                    count = 0
-                    start_pos = col
-                    obj_type = line[col]
-
-            flattened_world_x.append(tmp)
-
-        obj_type = None
-        start_pos = 0
-        count = 0
-        tmp = []
-        test = True
-
-        while test:
-            test = False
-            for line in range(len(flattened_world_x)):
-                if 0 < len(flattened_world_x[line]):
-                    if obj_type is None:
-                        obj_type = flattened_world_x[line][0]
-                        start_pos = line
-                        test = True
-
-                    if obj_type in flattened_world_x[line] and not obj_type.endswith("b"):
-                        count += 1
-                        flattened_world_x[line].remove(obj_type)
-                    else:
-                        tmp.append(str(start_pos) + ";" + str(start_pos + count - 1) + ";" + obj_type)
-                        count = 1
-                        start_pos = line
-                        obj_type = flattened_world_x[line][0]
-                        flattened_world_x[line].remove(obj_type)
-
-            if obj_type is not None:
-                tmp.append(str(start_pos) + ";" + str(start_pos + count - 1) + ";" + obj_type)
-                flattened_world.append(tmp)
-            obj_type = None
-            start_pos = 0
-            count = 0
-            tmp = []
+        labels = self.tmp_world
+
+        # Run length encoding of the lines
+        is_box = labels == BOX_CELL
+        starts = np.ones(labels.shape, dtype=bool)
+        starts[:, 1:] = (labels[:, 1:] != labels[:, :-1]) | is_box[:, 1:]
+        run_y, run_x0 = np.nonzero(starts)
+        ends = np.ones(labels.shape, dtype=bool)
+        ends[:, :-1] = starts[:, 1:]
+        run_x1 = np.nonzero(ends)[1]
+        run_label = labels[run_y, run_x0]
+
+        keep = run_label != EMPTY_CELL
+        run_y, run_x0, run_x1, run_label = run_y[keep], run_x0[keep], run_x1[keep], run_label[keep]
+
+        # Nothing placed, the level is written as an empty file
+        if len(run_y) == 0:
+            with open(self.world_file, "w") as out_fic:
+                out_fic.write("")
+            return
+
+        # A run continues the rectangle of the same run on the line below, except for boxes
+        order = np.lexsort((run_y, run_x1, run_x0, run_label))
+        run_y, run_x0, run_x1, run_label = run_y[order], run_x0[order], run_x1[order], run_label[order]
+        continues = np.zeros(len(run_y), dtype=bool)
+        continues[1:] = (
+            (run_label[1:] == run_label[:-1])
+            & (run_x0[1:] == run_x0[:-1])
+            & (run_x1[1:] == run_x1[:-1])
+            & (run_y[1:] == run_y[:-1] + 1)
+            & (run_label[1:] != BOX_CELL)
+        )
+        first = np.flatnonzero(~continues)
+        last = np.append(first[1:], len(run_y)) - 1
+
+        rect_y0, rect_y1 = run_y[first], run_y[last]
+        rect_x0, rect_x1, rect_label = run_x0[first], run_x1[first], run_label[first]
+        order = np.lexsort((rect_x0, rect_y0))
 
         objs = []
+        for y0, y1, x0, x1, label in zip(
+            rect_y0[order].tolist(),
+            rect_y1[order].tolist(),
+            rect_x0[order].tolist(),
+            rect_x1[order].tolist(),
+            rect_label[order].tolist(),
+        ):
+            objs.append("{} {} {} {} {}\n".format(CELL_TYPES[label], x1 - x0 + 1, y1 - y0 + 1, x0, y0))
 
         with open(self.world_file, "w") as out_fic:
-            for i in flattened_world:
-                for k in i:
-                    obj = k.split(";")
-                    if len(obj[4]) > 1:
-                        props = []
-                        words = re.split(r"\W+", obj[4][1:])
-                        for i in range(0, (len(words) - 2) // 2):
-                            key, value = words[2 * i + 1], words[2 * i + 2]
-                            props.append((key, value))
-
-                        s = (
-                            obj[4][0]
-                            + " "
-                            + str(int(obj[3]) - int(obj[2]) + 1)
-                            + " "
-                            + str(int(obj[1]) - int(obj[0]) + 1)
-                            + " "
-                            + obj[2]
-                            + " "
-                            + str(int(obj[0]))
-                            + " "
-                            + str(props)
-                            + "\n"
-                        )
-                    else:
-                        s = (
-                            obj[4]
-                            + " "
-                            + str(int(obj[3]) - int(obj[2]) + 1)
-                            + " "
-                            + str(int(obj[1]) - int(obj[0]) + 1)
-                            + " "
-                            + obj[2]
-                            + " "
-                            + str(int(obj[0]))
-                            + "\n"
-                        )
-                    objs.append(s)
-
-            out_fic.writelines(objs)
+            out_fic.write("".join(objs))
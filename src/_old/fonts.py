@@ -0,0 +1,96 @@
+from collections import OrderedDict
+
+import pygame
+
+DEFAULT_FONT = "Consolas"
+
+# Characters pre-rendered by the glyph atlases, enough for numbers, numpy arrays and coordinates
+NUMERIC_CHARACTERS = "0123456789.,-+e[]() :"
+
+
+class FontRegistry:
+    def __init__(self):
+        """
+        Resolves each system font once as pygame.font.SysFont looks up the system fonts on every call
+        """
+        # (name, size, bold) -> Font
+        self.fonts = {}
+
+    def get(self, size, name=DEFAULT_FONT, bold=False):
+        key = (name, size, bold)
+        font = self.fonts.get(key)
+        if font is None:
+            font = pygame.font.SysFont(name, size, bold)
+            self.fonts[key] = font
+        return font
+
+
+class GlyphAtlas:
+    def __init__(self, font, color, antialias=False, characters=NUMERIC_CHARACTERS):
+        """
+        Renders each character once so text changing every frame (fps, positions...) is drawn with one blit per
+        character instead of being rendered again
+        """
+        self.font = font
+        self.color = color
+        self.antialias = antialias
+        self.glyphs = {char: font.render(char, antialias, color) for char in characters}
+
+    def glyph(self, char):
+        glyph = self.glyphs.get(char)
+        if glyph is None:
+            glyph = self.font.render(char, self.antialias, self.color)
+            self.glyphs[char] = glyph
+        return glyph
+
+    def draw(self, screen, text, pos):
+        """
+        Blits the text at pos (top left corner) one glyph after the other
+        """
+        x, y = pos[0], pos[1]
+        for char in text:
+            glyph = self.glyph(char)
+            screen.blit(glyph, (x, y))
+            x += glyph.get_width()
+
+
+class TextCache:
+    def __init__(self, fonts, max_entries=512):
+        """
+        Keeps the surfaces of rendered texts so unchanged strings are not rendered again on every frame
+        :param fonts: FontRegistry used to get the fonts
+        :param max_entries: number of surfaces kept, the least recently used ones are dropped first
+        """
+        self.fonts = fonts
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.atlases = {}
+
+    def render(self, text, size, color, name=DEFAULT_FONT, bold=False, antialias=False):
+        key = (text, size, tuple(color), name, bold, antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+
+        surface = self.fonts.get(size, name, bold).render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+
+        return surface
+
+    def atlas(self, size, color, name=DEFAULT_FONT, bold=False, antialias=False):
+        """
+        :return: the GlyphAtlas of the font in that color
+        """
+        key = (size, tuple(color), name, bold, antialias)
+        atlas = self.atlases.get(key)
+        if atlas is None:
+            atlas = GlyphAtlas(self.fonts.get(size, name, bold), color, antialias)
+            self.atlases[key] = atlas
+        return atlas
+
+
+FONTS = FontRegistry()
+TEXTS = TextCache(FONTS)
@@ -7,6 +7,8 @@ from world import World
 class Game:
     def __init__(self, window_size, tile_size, game_scale, level=None):
         self.world = World(window_size, tile_size, game_scale, level)
+        if level is not None:
+            self.world.prefetch_level(level)
         self.window_size = window_size
         self.tile_size = tile_size
         self.scale = game_scale
@@ -26,6 +28,9 @@ class Game:
     def move_camera(self, dx, dy):
         self.world.move_camera(dx, dy)
 
+    def cycle_camera_mode(self):
+        self.world.camera.cycle_mode()
+
     def switch_debug_mode(self):
         self.debug_mode = not self.debug_mode
         self.world.switch_debug_mode()
@@ -36,9 +41,14 @@ class Game:
         :param fic: Path of the file to read
         """
         self.world.read_world(fic)
+        # A copy of the level loads in the background so resetting the world doesn't read it again
+        self.world.prefetch_level(self.world.level)
+
+    def change_level(self, level, background=True):
+        self.world.change_level(level, background)
 
-    def change_level(self, level):
-        self.world.change_level(level)
+    def prefetch_level(self, level):
+        self.world.prefetch_level(level)
 
     def reset(self):
         self.world.reset_world()
@@ -9,123 +9,170 @@ from constants import (
     SIDE_TOP_GROUND_RIGHT_PATH,
     TOP_GROUND_PATH,
 )
+from pygame.locals import RLEACCEL
+from surfaces import SCALED_SURFACES
+
+from assets import ASSETS
+
+# Size of the ground tiles in pixels
+GROUND_TILE_SIZE = 27
+
+# (width, height) -> sprite shared by every Ground of that shape
+GROUND_SPRITES = {}
+
+
+def ground_tiles():
+    """
+    :return: top, low, side top left, side top right and both side top tiles as (27, 27, 3) RGB arrays
+    """
+    return [
+        pygame.surfarray.array3d(ASSETS.get(path)).transpose((1, 0, 2))
+        for path in (
+            TOP_GROUND_PATH,
+            LOW_GROUND_PATH,
+            SIDE_TOP_GROUND_LEFT_PATH,
+            SIDE_TOP_GROUND_RIGHT_PATH,
+            BOTH_SIDE_TOP_GROUND_PATH,
+        )
+    ]
+
+
+def bake_ground_sprite(width, height):
+    """
+    Assembles the sprite of a ground from its tiles : one row of top tiles with the sides on each end then
+    height rows of low tiles. The result is cached so grounds with the same shape share the same surface
+    :param width: width of the ground in tiles
+    :param height: height of the ground in tiles
+    """
+    key = (width, height)
+    sprite = GROUND_SPRITES.get(key)
+    if sprite is not None:
+        return sprite
+
+    top, low, side_left, side_right, both_sides = ground_tiles()
+    size = GROUND_TILE_SIZE
+
+    if width > 1:
+        pixels = np.empty(((height + 1) * size, width * size, 3), dtype=np.uint8)
+        pixels[:size, :size] = side_left
+        pixels[:size, size:-size] = np.tile(top, (1, width - 2, 1))
+        pixels[:size, -size:] = side_right
+        pixels[size:] = np.tile(low, (height, width, 1))
+    elif width == 1:
+        pixels = np.empty(((height + 1) * size, size, 3), dtype=np.uint8)
+        pixels[:size] = both_sides
+        pixels[size:] = np.tile(low, (height, 1, 1))
+    else:
+        pixels = side_left
+
+    sprite = pygame.surfarray.make_surface(pixels.transpose((1, 0, 2)))
+    if pygame.display.get_surface() is not None:
+        sprite = sprite.convert()
+    sprite.set_colorkey((255, 255, 255), RLEACCEL)
+
+    GROUND_SPRITES[key] = sprite
+    return sprite
 
 
 class GameObject:
+    # Levels hold up to millions of objects : no __dict__ and the position as two scalars
+    __slots__ = ("debug_mode", "height", "on_screen", "static_layer", "width", "x", "y")
+
+    color = (0, 0, 0)
+
     def __init__(self, *args):
         """args[0] -> width of the object (integer counted in squares) \n
         args[1] -> height of the object (integer in squares) \n
         args[2] -> pos of the object (tuple of int in squares)"""
         self.width = args[0]
         self.height = args[1]
-        self.pos = np.array(args[2])
-        self.color = np.array((0, 0, 0))
+        self.x, self.y = args[2]
         self.on_screen = True
         self.debug_mode = False
+        # StaticLayer that pre-renders the object if any
+        self.static_layer = None
+
+    @property
+    def pos(self):
+        """
+        New array of the position, hot paths read x and y instead
+        """
+        return np.array((self.x, self.y))
+
+    @pos.setter
+    def pos(self, pos):
+        self.x, self.y = pos
 
     def to_string(self):
         return "width : {0}, height : {1}, pos : {2}".format(self.width, self.height, self.pos)
 
+    def bake(self, screen, coords, width, height):
+        """
+        Draws the object even if it's not on screen, used to pre-render the static layer
+        """
+        pygame.draw.rect(screen, self.color, pygame.Rect(coords, (int(width), int(height))))
+
     def draw(self, screen, coords, width, height):
         if self.on_screen:
-            pygame.draw.rect(screen, self.color, pygame.Rect(coords, (int(width), int(height))))
+            self.bake(screen, coords, width, height)
 
 
 class Plateforme(GameObject):
+    __slots__ = ()
+
+    color = (200, 30, 30)
+
     def __init__(self, *args, **kwargs):
         """args[0] -> width of the object (integer counted in squares) \n
         args[1] -> height of the object (integer in squares) \n
         args[2] -> pos of the object (tuple of int in squares)"""
         super().__init__(args[0], args[1], args[2])
-        self.color = (200, 30, 30)
 
 
 class Ground(GameObject):
+    __slots__ = ("sprite",)
+
+    color = (30, 200, 30)
+
     def __init__(self, *args, **kwargs):
         """args[0] -> width of the object (integer counted in squares) \n
         args[1] -> height of the object (integer in squares) \n
         args[2] -> pos of the object (tuple of int in squares)"""
         super().__init__(args[0], args[1], args[2])
-        self.color = (30, 200, 30)
-        self.sprites = [
-            pygame.image.load(TOP_GROUND_PATH),
-            pygame.image.load(LOW_GROUND_PATH),
-            pygame.image.load(SIDE_TOP_GROUND_LEFT_PATH),
-            pygame.image.load(SIDE_TOP_GROUND_RIGHT_PATH),
-            pygame.image.load(BOTH_SIDE_TOP_GROUND_PATH),
-        ]
-
-        surfarrays = [
-            np.array(pygame.surfarray.pixels3d(self.sprites[0])).transpose((1, 0, 2)),
-            np.array(pygame.surfarray.pixels3d(self.sprites[1])).transpose((1, 0, 2)),
-            np.array(pygame.surfarray.pixels3d(self.sprites[2])).transpose((1, 0, 2)),
-            np.array(pygame.surfarray.pixels3d(self.sprites[3])).transpose((1, 0, 2)),
-            np.array(pygame.surfarray.pixels3d(self.sprites[4])).transpose((1, 0, 2)),
-        ]
-
-        if self.width > 1:
-            im_array = surfarrays[2]
-            for i in range(self.width - 1):
-                if i != self.width - 2:
-                    im_array = np.concatenate((im_array, surfarrays[0]), axis=1)
-                else:
-                    im_array = np.concatenate((im_array, surfarrays[3]), axis=1)
-
-            for j in range(self.height):
-                tmp = surfarrays[1]
-                for i in range(self.width - 1):
-                    tmp = np.concatenate((tmp, surfarrays[1]), axis=1)
-
-                im_array = np.concatenate((im_array, tmp))
-
-            self.sprite = pygame.image.fromstring(
-                im_array.tobytes(), ((self.width) * 27, (self.height + 1) * 27), "RGB"
-            )
-            self.sprite.set_colorkey((255, 255, 255))
-
-        elif self.width == 1:
-            im_array = surfarrays[4]
-            for j in range(self.height):
-                im_array = np.concatenate((im_array, surfarrays[1]))
-
-            self.sprite = pygame.image.fromstring(
-                im_array.tobytes(), ((self.width) * 27, (self.height + 1) * 27), "RGB"
-            )
-            self.sprite.set_colorkey((255, 255, 255))
-
-        else:
-            im_array = surfarrays[2]
-            for j in range(self.height):
-                np.concatenate((im_array, surfarrays[1]), axis=1)
-
-            self.sprite = pygame.image.fromstring(
-                im_array.tobytes(),
-                ((self.width + 1) * 27, (self.height + 1) * 27),
-                "RGB",
-            ).convert()
-            self.sprite.set_colorkey((255, 255, 255))
+        self.sprite = bake_ground_sprite(self.width, self.height)
+
+    def bake(self, screen, coords, width, height):
+        screen.blit(SCALED_SURFACES.get(self.sprite, (int(width), int(height))), coords)
 
     def draw(self, screen, coords, width, height):
         if self.on_screen:
-            screen.blit(pygame.transform.scale(self.sprite, (int(width), int(height))), coords)
+            self.bake(screen, coords, width, height)
             if self.debug_mode:
                 pygame.draw.ellipse(screen, (0, 0, 0), pygame.Rect([coords - (3, 3), (6, 6)]), 0)
 
 
 class Box(GameObject):
+    __slots__ = ("isBroken", "sprite")
+
+    color = (255, 60, 0)
+
     def __init__(self, *args):
         super().__init__(args[0], args[1], args[2])
-        self.color = (255, 60, 0)
-        self.sprite = pygame.image.load(BLOCK_PATH)
+        self.sprite = ASSETS.get(BLOCK_PATH)
         self.isBroken = False
 
+    def bake(self, screen, coords, width, height):
+        screen.blit(SCALED_SURFACES.get(self.sprite, (int(width), int(height))), coords)
+
     def draw(self, screen, coords, width, height):
         if self.on_screen:
-            screen.blit(pygame.transform.scale(self.sprite, (int(width), int(height))), coords)
+            self.bake(screen, coords, width, height)
             if self.debug_mode:
                 pygame.draw.ellipse(screen, (0, 0, 0), pygame.Rect([coords - (3, 3), (6, 6)]), 0)
 
     def activate(self):
         if not self.isBroken:
             self.isBroken = True
-            self.sprite = pygame.image.load(BROKEN_BLOCK_PATH)
+            self.sprite = ASSETS.get(BROKEN_BLOCK_PATH)
+            if self.static_layer is not None:
+                self.static_layer.invalidate(self)
@@ -0,0 +1,127 @@
+import argparse
+import mmap
+import struct
+
+import numpy as np
+
+# Binary level layout (little endian) :
+# header          magic "M2DL", version (u16), number of sections (u16)
+# section table   one entry per object type : type (1 char + 3 padding bytes), number of records (u32), offset (u64)
+# sections        packed records, each section starting on a 16 bytes boundary
+LEVEL_MAGIC = b"M2DL"
+LEVEL_VERSION = 1
+LEVEL_EXTENSION = ".wdb"
+HEADER = struct.Struct("<4sHH")
+SECTION = struct.Struct("<cxxxIQ")
+SECTION_ALIGNMENT = 16
+
+# Types : g (Ground), P (Player), E (Enemy), b (Box), p (Platform), same as the .wd text format
+OBJECT_TYPES = ("P", "E", "g", "b", "p")
+# Sizes are floats because actors can be a fraction of tile, positions are in tiles
+RECORD = np.dtype([("width", "<f4"), ("height", "<f4"), ("x", "<i4"), ("y", "<i4")])
+
+
+def parse_text_level(path):
+    """
+    Reads a .wd file, lines that are not "type width height x y" are ignored like in World.read_world
+    :return: dict of the records (width, height, x, y) of each object type in file order
+    """
+    sections = {obj_type: [] for obj_type in OBJECT_TYPES}
+    with open(path, "r") as f:
+        for line in f:
+            tmp = line.split()
+            if len(tmp) == 5 and tmp[0] in sections:
+                sections[tmp[0]].append((float(tmp[1]), float(tmp[2]), int(tmp[3]), int(tmp[4])))
+
+    return {obj_type: np.array(records, dtype=RECORD) for obj_type, records in sections.items()}
+
+
+def write_binary_level(path, sections):
+    """
+    :param sections: dict of the records of each object type, arrays of RECORD or lists of (width, height, x, y)
+    """
+    sections = {obj_type: np.asarray(records, dtype=RECORD) for obj_type, records in sections.items()}
+
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = []
+    for obj_type, records in sections.items():
+        offset += -offset % SECTION_ALIGNMENT
+        table.append((obj_type, len(records), offset))
+        offset += records.nbytes
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(LEVEL_MAGIC, LEVEL_VERSION, len(sections)))
+        for obj_type, count, section_offset in table:
+            f.write(SECTION.pack(obj_type.encode("ascii"), count, section_offset))
+        for (_, _, section_offset), records in zip(table, sections.values()):
+            f.write(b"\0" * (section_offset - f.tell()))
+            f.write(records.tobytes())
+
+
+def is_binary_level(path):
+    with open(path, "rb") as f:
+        return f.read(len(LEVEL_MAGIC)) == LEVEL_MAGIC
+
+
+def read_binary_level(path):
+    """
+    Maps the file in memory and returns views on its sections, nothing is copied until the records are used
+    The file stays mapped as long as one of the arrays is alive
+    :return: dict of the RECORD arrays of each object type
+    """
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, nb_sections = HEADER.unpack_from(data, 0)
+    if magic != LEVEL_MAGIC:
+        raise ValueError("{0} is not a binary level".format(path))
+    if version != LEVEL_VERSION:
+        raise ValueError("{0} has version {1}, expected {2}".format(path, version, LEVEL_VERSION))
+
+    sections = {}
+    for i in range(nb_sections):
+        obj_type, count, offset = SECTION.unpack_from(data, HEADER.size + i * SECTION.size)
+        sections[obj_type.decode("ascii")] = np.frombuffer(data, dtype=RECORD, count=count, offset=offset)
+
+    return sections
+
+
+def convert(source, destination, verify=False):
+    """
+    Converts a .wd text level to the binary format
+    :param verify: read the binary file back and compare it to the text one
+    :return: False if the verification failed
+    """
+    sections = parse_text_level(source)
+    write_binary_level(destination, sections)
+
+    if verify:
+        converted = read_binary_level(destination)
+        return converted.keys() == sections.keys() and all(
+            np.array_equal(converted[obj_type], records) for obj_type, records in sections.items()
+        )
+
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Converts .wd levels to the binary level format")
+    parser.add_argument("source", help="path of the .wd level")
+    parser.add_argument("destination", nargs="?", help="path of the binary level, next to the source by default")
+    parser.add_argument("--verify", action="store_true", help="check that the binary level reads back the same")
+    args = parser.parse_args(argv)
+
+    destination = args.destination
+    if destination is None:
+        destination = args.source.rsplit(".", 1)[0] + LEVEL_EXTENSION
+
+    if not convert(args.source, destination, args.verify):
+        print("Round trip failed for {0}".format(destination))
+        return 1
+
+    print("Converted {0} to {1}".format(args.source, destination))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
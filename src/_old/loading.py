@@ -0,0 +1,139 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from levels import is_binary_level, parse_text_level, read_binary_level
+
+# Number of records created on each frame in the World being loaded
+LOADING_BATCH = 256
+
+
+def read_level(path):
+    """
+    Reads and parses the level, runs on the loader thread so it only builds numpy arrays, pygame surfaces and the
+    sprite caches are only touched on the main thread
+    :return: dict of the RECORD arrays of each object type
+    """
+    return read_binary_level(path) if is_binary_level(path) else parse_text_level(path)
+
+
+class LoadingJob:
+    def __init__(self, path):
+        """
+        Level read on the loader thread, then created a batch of records per frame on the main thread in a World
+        that isn't used yet, so the current one keeps running until it's swapped
+        """
+        self.path = path
+        self.future = None
+        self.world = None
+        # (object type, records) left to create in the world
+        self.batches = deque()
+        self.total = 1
+        self.created = 0
+        self.progress = 0.0
+
+    def complete(self):
+        return self.world is not None and not self.batches
+
+    def start(self, make_world):
+        sections = self.future.result()
+        self.world = make_world()
+        self.world.level = self.path
+        self.batches = deque(
+            (obj_type, records[start : start + LOADING_BATCH])
+            for obj_type, records in sections.items()
+            for start in range(0, len(records), LOADING_BATCH)
+        )
+        self.total = max(sum(len(records) for records in sections.values()), 1)
+        self.created = 0
+
+    def step(self, make_world):
+        """
+        Creates the next batch of records once the level is read
+        :param make_world: callable returning an empty World
+        """
+        if self.world is None:
+            if not self.future.done():
+                return
+            self.start(make_world)
+
+        if self.batches:
+            obj_type, records = self.batches.popleft()
+            self.world.add_level_sections({obj_type: records})
+            self.created += len(records)
+        self.progress = self.created / self.total if self.batches else 1.0
+
+    def finish(self, make_world):
+        """
+        :return: the loaded World, waits for the level to be read and creates the records left
+        """
+        if self.world is None:
+            self.start(make_world)
+        while self.batches:
+            self.step(make_world)
+        self.progress = 1.0
+        return self.world
+
+    def restart(self):
+        """
+        Drops the objects created so far, the level read is kept
+        """
+        self.world = None
+        self.batches = deque()
+        self.created = 0
+        self.progress = 0.0
+
+
+class LevelLoader:
+    def __init__(self):
+        """
+        Reads levels on a worker thread, one at a time, and creates their objects on the main thread a batch per
+        frame. The jobs are kept until the world takes them
+        """
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="LevelLoader")
+        # path -> LoadingJob
+        self.jobs = {}
+
+    def prefetch(self, path):
+        """
+        Starts loading the level in the background if it's not already loading
+        :return: the LoadingJob of the level
+        """
+        job = self.jobs.get(path)
+        if job is None:
+            job = LoadingJob(path)
+            job.future = self.executor.submit(read_level, path)
+            self.jobs[path] = job
+        return job
+
+    def step(self, make_world, first=None):
+        """
+        Creates a batch of records of one level not loaded yet, called once per frame on the main thread
+        :param first: job loaded before the others, the level the world waits for to change
+        """
+        if first is not None and not first.complete():
+            first.step(make_world)
+            return
+        for job in self.jobs.values():
+            if not job.complete():
+                job.step(make_world)
+                return
+
+    def take(self, path, make_world):
+        """
+        :return: the World of the level, finished now if needed and forgotten by the loader, or None if it was never
+            prefetched
+        """
+        job = self.jobs.pop(path, None)
+        if job is None:
+            return None
+        return job.finish(make_world)
+
+    def drop(self, path):
+        self.jobs.pop(path, None)
+
+    def restart(self):
+        """
+        Creates the objects of every level again, when the size of the tiles changed for example
+        """
+        for job in self.jobs.values():
+            job.restart()
@@ -0,0 +1,108 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+import pygame
+from actors import Enemy
+from component import Component
+from constants import SPRITE_PATHS
+from game_objects import Box, Plateforme
+
+from assets import ASSETS
+
+
+def make_objects(kind, count):
+    """
+    :return: count objects of the kind, spread along x like the tiles and actors of a level
+    """
+    if kind == "tile":
+        return [Plateforme(1, 1, (i, i % 16)) for i in range(count)]
+    if kind == "box":
+        return [Box(1, 1, (i, 5)) for i in range(count)]
+    if kind == "actor":
+        return [Enemy(1.0, 2.0, (i * 26, 130)) for i in range(count)]
+    return [Component(None, 10, 10, None, [i, 0]) for i in range(count)]
+
+
+def bytes_per_object(kind, count):
+    """
+    :return: memory allocated to create the objects divided by their number, their own arrays and lists included
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = make_objects(kind, count)
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del objects
+    return allocated / count
+
+
+def access_ns(objects, statement, number):
+    """
+    :return: time in ns of running the statement once on each object, best of 5 runs
+    """
+    loop = "for obj in objects:\n    " + statement
+    best = min(timeit.repeat(loop, globals={"objects": objects}, number=number, repeat=5))
+    return best / number / len(objects) * 1e9
+
+
+def run(args):
+    pygame.display.set_mode((1, 1))
+    ASSETS.preload(SPRITE_PATHS)
+
+    results = {}
+    for kind in ("tile", "box", "actor", "component"):
+        objects = make_objects(kind, args.access_objects)
+        results[kind] = {
+            "bytes_per_object": bytes_per_object(kind, args.count),
+            "read_width_ns": access_ns(objects, "obj.width", args.number),
+            "read_pos_ns": access_ns(objects, "obj.pos[0]", args.number),
+            # Scalar position of the objects that have one
+            "read_x_ns": access_ns(objects, "obj.x", args.number) if hasattr(objects[0], "x") else None,
+            "write_on_screen_ns": access_ns(objects, "obj.on_screen = True", args.number)
+            if kind != "component"
+            else None,
+            "has_dict": hasattr(objects[0], "__dict__"),
+        }
+
+    return {
+        "config": {"count": args.count, "access_objects": args.access_objects, "number": args.number},
+        "python": sys.version.split()[0],
+        "objects": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Reports the memory used by each game object, actor and component and the cost of their attributes"
+    )
+    parser.add_argument("--count", type=int, default=100000, help="objects created to measure the memory")
+    parser.add_argument("--access-objects", type=int, default=1000, help="objects the attribute accesses loop over")
+    parser.add_argument("--number", type=int, default=200, help="loops over the objects timed")
+    parser.add_argument("--output", help="JSON file to write, printed when not given")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.init()
+    try:
+        results = run(args)
+    finally:
+        pygame.quit()
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,4 +1,5 @@
 # Events ids used inside pygame events not to get limited
+import pygame
 from component import EDITOR_EVENT, Background, Button, Component, Image, Text
 from constants import BALKANY_PATH, BLOCK_PATH, TEST_BUTTON_PATH, TOP_GROUND_PATH
 
@@ -21,6 +22,37 @@ class Overlay:
         self.width = width
         self.height = height
         self.components = []
+        # Areas of the screen changed since the last draw_dirty, the whole overlay has to be drawn at first
+        self.dirty_rects = [pygame.Rect(0, 0, width, height)]
+
+    def add_dirty_rect(self, rect):
+        self.dirty_rects.append(pygame.Rect(rect))
+
+    def mark_dirty(self):
+        """
+        Asks for the whole overlay to be drawn again, when what's under it changed for example
+        """
+        self.dirty_rects = [pygame.Rect(0, 0, self.width, self.height)]
+
+    def draw_dirty(self, screen, background):
+        """
+        Draws again only the areas that changed since the last call
+        :param background: color filling the areas before drawing the components on them
+        :return: list of the Rects drawn, empty if nothing changed
+        """
+        if not self.dirty_rects:
+            return []
+
+        rects = self.dirty_rects
+        self.dirty_rects = []
+        clip = screen.get_clip()
+        for rect in rects:
+            screen.set_clip(rect)
+            screen.fill(background, rect)
+            self.draw(screen)
+        screen.set_clip(clip)
+
+        return rects
 
     def add_component(self, *args):
         for cp in args:
@@ -33,11 +65,7 @@ class Overlay:
 
     def check_click_pos(self, pos):
         for cp in self.components:
-            if (
-                not isinstance(cp, Background)
-                and cp.pos[0] < pos[0] < cp.pos[0] + cp.width
-                and cp.pos[1] < pos[1] < cp.pos[1] + cp.height
-            ):
+            if not isinstance(cp, Background) and cp.x < pos[0] < cp.x + cp.width and cp.y < pos[1] < cp.y + cp.height:
                 cp.throw_event()
                 return True
 
@@ -45,12 +73,13 @@ class Overlay:
         for cp in self.components:
             cp.resize(self.width, width, self.height, height)
             cp.move(
-                cp.pos[0] * width // self.width - cp.pos[0],
-                cp.pos[1] * height // self.height - cp.pos[1],
+                cp.x * width // self.width - cp.x,
+                cp.y * height // self.height - cp.y,
             )
 
         self.width = width
         self.height = height
+        self.mark_dirty()
 
 
 class GameOverlay(Overlay):
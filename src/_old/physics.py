@@ -0,0 +1,329 @@
+import numpy as np
+from tilegrid import ONE_WAY, TileGrid
+
+# Arrays of EnemyBatch with one row per enemy, besides pos and speed that the enemies have views on
+BATCH_ARRAYS = (
+    "size",
+    "gravity",
+    "seconds_falling",
+    "on_ground",
+    "can_move_up",
+    "can_move_left",
+    "can_move_right",
+    "on_screen",
+    "life",
+    "bounds",
+)
+
+# Rounds of EnemyBatch.separate per frame, each enemy is pushed at most once per round
+SEPARATE_ROUNDS = 8
+
+
+class EnemyBatch:
+    def __init__(self, enemies):
+        """
+        Holds the physics state of every enemy in contiguous arrays so gravity, integration and ground collisions
+        run as whole array operations instead of one Enemy.update per enemy
+        The pos and speed of each enemy become views on a row of the arrays so the rest of the game
+        (drawing, actor contacts...) keeps reading and writing them as before
+        :param enemies: list of Enemy
+        """
+        self.enemies = []
+        self.index = {}
+        # Enemy indices sorted on the left edge of their swept box, kept between frames like in SweepAndPrune so
+        # enemies on the same x stay in the same order
+        self.sorted = np.zeros(0, dtype=np.int64)
+        # (xmin, ymin, xmax, ymax) of the box swept by each enemy on the last separate
+        self.bounds = np.zeros((0, 4))
+        self.rebuild(enemies)
+
+    def rebuild(self, enemies):
+        """
+        Packs the enemies into new arrays, used when enemies are added or removed
+        """
+        enemies = list(enemies)
+        index = {enemy: i for i, enemy in enumerate(enemies)}
+        # The enemies already in the batch keep their order on x and the new ones come after them
+        kept = [index[enemy] for enemy in map(self.enemies.__getitem__, self.sorted.tolist()) if enemy in index]
+        added = [i for i, enemy in enumerate(enemies) if enemy not in self.index]
+        self.sorted = np.array(kept + added, dtype=np.int64)
+
+        self.enemies = enemies
+        self.index = index
+        count = len(self.enemies)
+
+        self.pos = np.array([e.pos for e in self.enemies], dtype=float).reshape(count, 2)
+        self.speed = np.array([e.speed for e in self.enemies], dtype=float).reshape(count, 2)
+        self.size = np.array([(e.width, e.height) for e in self.enemies], dtype=float).reshape(count, 2)
+        self.gravity = np.array([e.max_vertical_speed * e.weight for e in self.enemies], dtype=float)
+        self.seconds_falling = np.array([e.seconds_falling for e in self.enemies], dtype=float)
+        self.on_ground = np.array([e.on_ground for e in self.enemies], dtype=bool)
+        self.can_move_up = np.array([e.can_move_up for e in self.enemies], dtype=bool)
+        self.can_move_left = np.array([e.can_move_left for e in self.enemies], dtype=bool)
+        self.can_move_right = np.array([e.can_move_right for e in self.enemies], dtype=bool)
+        self.on_screen = np.array([e.on_screen for e in self.enemies], dtype=bool)
+        self.life = np.array([e.life for e in self.enemies], dtype=float)
+        self.bounds = np.zeros((count, 4))
+
+        for i, enemy in enumerate(self.enemies):
+            enemy.pos = self.pos[i]
+            enemy.speed = self.speed[i]
+
+    def write_back(self):
+        """
+        Copies the state flags into the Enemy instances and gives them back their own arrays
+        Used before going back to the scalar path
+        """
+        for i, enemy in enumerate(self.enemies):
+            enemy.pos = self.pos[i].copy()
+            enemy.speed = self.speed[i].copy()
+            enemy.seconds_falling = float(self.seconds_falling[i])
+            enemy.on_ground = bool(self.on_ground[i])
+            enemy.can_move_up = bool(self.can_move_up[i])
+            enemy.can_move_left = bool(self.can_move_left[i])
+            enemy.can_move_right = bool(self.can_move_right[i])
+
+    def update_on_screen(self, left, right, tile_size):
+        """
+        Flags the enemies crossing the screen like World.update does for each actor, only the enemies whose flag
+        changed are written
+        :param left, right: x of the edges of the screen in pixels
+        """
+        on_screen = (self.pos[:, 0] + self.size[:, 0] * tile_size[0] > left) & (self.pos[:, 0] < right)
+        for i in np.flatnonzero(on_screen != self.on_screen).tolist():
+            self.enemies[i].on_screen = bool(on_screen[i])
+        self.on_screen = on_screen
+
+    def dead(self):
+        """
+        Only the player takes life from the enemies and it only hits the ones on screen, so only their life is read
+        :return: mask of the enemies with no life left
+        """
+        visible = np.flatnonzero(self.on_screen).tolist()
+        self.life[visible] = [self.enemies[i].life for i in visible]
+        return self.life < 1
+
+    def remove(self, removed):
+        """
+        Compacts the arrays once for all the enemies of the mask, pos and speed are compacted in place so only the
+        enemies after the first removed one get views on their new rows
+        :param removed: mask of the enemies to remove
+        :return: list of the removed Enemy
+        """
+        keep = ~removed
+        count = int(keep.sum())
+        first = int(np.argmax(removed))
+        gone = [self.enemies[i] for i in np.flatnonzero(removed).tolist()]
+
+        self.enemies = [enemy for enemy, kept in zip(self.enemies, keep.tolist()) if kept]
+        self.index = {enemy: i for i, enemy in enumerate(self.enemies)}
+        self.pos[:count] = self.pos[keep]
+        self.pos = self.pos[:count]
+        self.speed[:count] = self.speed[keep]
+        self.speed = self.speed[:count]
+        for name in BATCH_ARRAYS:
+            setattr(self, name, getattr(self, name)[keep])
+        new_index = np.cumsum(keep) - 1
+        self.sorted = new_index[self.sorted[keep[self.sorted]]]
+
+        for i in range(first, count):
+            self.enemies[i].pos = self.pos[i]
+            self.enemies[i].speed = self.speed[i]
+        return gone
+
+    def pairs(self, tile_size):
+        """
+        Same pairs as SweepAndPrune.pairs between the enemies and in the same order, found with array operations
+        :return: (first, second) arrays of enemy indices, first < second
+        """
+        x, y = self.pos[:, 0], self.pos[:, 1]
+        next_x, next_y = x + self.speed[:, 0], y + self.speed[:, 1]
+        self.bounds = np.stack(
+            (
+                np.minimum(x, next_x),
+                np.minimum(y, next_y),
+                np.maximum(x, next_x) + self.size[:, 0] * tile_size[0],
+                np.maximum(y, next_y) + self.size[:, 1] * tile_size[1],
+            ),
+            axis=1,
+        )
+        xmin, ymin, xmax, ymax = self.bounds.T
+        self.sorted = self.sorted[np.argsort(xmin[self.sorted], kind="stable")]
+
+        # Each enemy goes with the next ones on x starting before its right edge
+        count = len(self.sorted)
+        ends = np.searchsorted(xmin[self.sorted], xmax[self.sorted], side="right")
+        followers = np.maximum(ends - np.arange(count) - 1, 0)
+        firsts = np.repeat(np.arange(count), followers)
+        seconds = firsts + 1 + np.arange(len(firsts)) - np.repeat(np.cumsum(followers) - followers, followers)
+        a, b = self.sorted[firsts], self.sorted[seconds]
+        overlap = (ymin[a] <= ymax[b]) & (ymin[b] <= ymax[a])
+        firsts, seconds, a, b = firsts[overlap], seconds[overlap], a[overlap], b[overlap]
+
+        # The sweep finds the pairs of an enemy when it reaches it, after the ones of the enemies before it
+        order = np.lexsort((firsts, seconds))
+        a, b = a[order], b[order]
+        return np.minimum(a, b), np.maximum(a, b)
+
+    def separate(self, tile_size):
+        """
+        Pushes the overlapping enemies apart like Actor.separate with array operations. The overlapping pairs are
+        resolved in rounds where each enemy is in one pair, taken in the order of the pairs
+        The scalar path goes through all the pairs once, here crowds too packed to be resolved in SEPARATE_ROUNDS
+        rounds are resolved over the next frames, so they can end up in slightly different positions
+        """
+        first, second = self.pairs(tile_size)
+        size = self.size * tile_size
+        pending = np.arange(len(first))
+        for _ in range(SEPARATE_ROUNDS):
+            pending = pending[self.overlapping(first[pending], second[pending], size)]
+            a, b = first[pending], second[pending]
+            # Position in pending of the first pair of each enemy
+            positions = np.arange(len(pending))
+            earliest = np.full(len(self.enemies), len(pending))
+            np.minimum.at(earliest, a, positions)
+            np.minimum.at(earliest, b, positions)
+            ready = (earliest[a] == positions) & (earliest[b] == positions)
+            self.separate_pairs(a[ready], b[ready], size)
+            pending = pending[~ready]
+            if not len(pending):
+                return
+
+    def overlapping(self, a, b, size):
+        """
+        :param size: size of the enemies in pixels
+        :return: mask of the pairs of enemies overlapping, edges touching don't count
+        """
+        # Indexing the columns is a lot faster than taking whole rows of pos
+        x, y = self.pos[:, 0], self.pos[:, 1]
+        right, bottom = x + size[:, 0], y + size[:, 1]
+        return (np.minimum(right[a], right[b]) > np.maximum(x[a], x[b])) & (
+            np.minimum(bottom[a], bottom[b]) > np.maximum(y[a], y[b])
+        )
+
+    def separate_pairs(self, a, b, size):
+        """
+        Actor.separate on overlapping pairs of distinct enemies
+        :param size: size of the enemies in pixels
+        """
+        x, y = self.pos[:, 0], self.pos[:, 1]
+        xa, xb, ya, yb = x[a], x[b], y[a], y[b]
+        dx = np.minimum(xa + size[a, 0], xb + size[b, 0]) - np.maximum(xa, xb)
+        dy = np.minimum(ya + size[a, 1], yb + size[b, 1]) - np.maximum(ya, yb)
+
+        # The enemy on top lands on the other one
+        vertical = dy < dx
+        a_up = ya >= yb
+        upper = np.where(a_up, a, b)[vertical]
+        lower = np.where(a_up, b, a)[vertical]
+        y[upper] = y[lower] + size[lower, 1]
+        self.speed[upper, 1] = 0
+        self.on_ground[upper] = True
+        self.seconds_falling[upper] = 0
+
+        # Enemies side by side are both pushed by half the overlap
+        horizontal = ~vertical
+        a_left = xa <= xb
+        left = np.where(a_left, a, b)[horizontal]
+        right = np.where(a_left, b, a)[horizontal]
+        shift = np.ceil(dx[horizontal] / 2)
+        x[left] -= shift
+        x[right] += np.ceil(dx[horizontal]) - shift
+
+    def query_actor(self, actor, tile_size):
+        """
+        Same as SweepAndPrune.query_actor on the boxes of the last separate, used by the player
+        :return: the enemies whose boxes overlap the one swept by the actor, in insertion order
+        """
+        x, y = actor.pos[0], actor.pos[1]
+        next_x, next_y = x + actor.speed[0], y + actor.speed[1]
+        x0, y0 = min(x, next_x), min(y, next_y)
+        x1, y1 = max(x, next_x) + actor.width * tile_size[0], max(y, next_y) + actor.height * tile_size[1]
+        xmin, ymin, xmax, ymax = self.bounds.T
+        hits = np.flatnonzero((xmin <= x1) & (xmax >= x0) & (ymin <= y1) & (y0 <= ymax))
+        return [self.enemies[i] for i in hits.tolist()]
+
+    def step(self, dt, size_ratio, collision_grid, tile_size, game_scale):
+        """
+        Same physics as Enemy.update for all the enemies at once
+
+        Collisions are all tested from the position the enemies have at the start of the step, when an enemy
+        touches several objects the last one in World.game_objects order sets its position like in the scalar path
+        :param collision_grid: SpatialHash holding the game objects, or the TileGrid of the level
+        """
+        if not self.enemies:
+            return
+
+        # Gravity
+        falling = ~self.on_ground
+        self.speed[falling, 1] -= self.gravity[falling] * self.seconds_falling[falling] * size_ratio[1] * game_scale
+        self.seconds_falling[falling] += dt
+        self.speed[self.on_ground, 1] = 0
+
+        movement = self.speed.copy()
+        step = np.round(self.speed)
+        size = self.size * tile_size
+
+        # Broadphase on the area swept by each enemy
+        swept_min = np.minimum(self.pos, self.pos + step)
+        swept_max = np.maximum(self.pos, self.pos + step) + size
+        enemy_ids, obj_ids = collision_grid.query_boxes(
+            swept_min[:, 0] / tile_size[0],
+            swept_min[:, 1] / tile_size[1],
+            swept_max[:, 0] / tile_size[0],
+            swept_max[:, 1] / tile_size[1],
+        )
+
+        # Narrowphase, same tests as Actor.check_position_collisions
+        tiles = isinstance(collision_grid, TileGrid)
+        if tiles:
+            rects = collision_grid.cell_rects(obj_ids)
+        else:
+            rects = collision_grid.rects[obj_ids]
+        obj_x, obj_y = rects[:, 0] * tile_size[0], rects[:, 1] * tile_size[1]
+        obj_right, obj_top = (rects[:, 0] + rects[:, 2]) * tile_size[0], (rects[:, 1] + rects[:, 3]) * tile_size[1]
+        x, y = self.pos[enemy_ids, 0], self.pos[enemy_ids, 1]
+        width, height = size[enemy_ids, 0], size[enemy_ids, 1]
+        next_x, next_y = x + step[enemy_ids, 0], y + step[enemy_ids, 1]
+
+        hit = (next_y <= obj_top) & (next_y + height >= obj_y) & (next_x < obj_right) & (next_x + width > obj_x)
+        above = hit & (y >= obj_top)
+        if tiles:
+            # One-way cells only stop the enemies landing on them
+            hit &= above | ((collision_grid.cell_flags(obj_ids) & ONE_WAY) == 0)
+        below = hit & ~above & (y + height <= obj_y)
+        left = hit & ~above & ~below & (x + width <= obj_x)
+        right = hit & ~above & ~below & ~left & (x >= obj_right)
+
+        count = len(self.enemies)
+        vertical = above | below
+        horizontal = left | right
+        snapped_y = np.where(above, obj_top, obj_y - height)
+        snapped_x = np.where(left, obj_x - width, obj_right)
+
+        # Pairs are sorted by object for each enemy so the highest pair index is the last object touched
+        pair_ids = np.arange(len(hit))
+        last_vertical = np.full(count, -1)
+        np.maximum.at(last_vertical, enemy_ids[vertical], pair_ids[vertical])
+        last_horizontal = np.full(count, -1)
+        np.maximum.at(last_horizontal, enemy_ids[horizontal], pair_ids[horizontal])
+
+        snapped = last_vertical >= 0
+        self.pos[snapped, 1] = snapped_y[last_vertical[snapped]]
+        movement[snapped, 1] = 0
+        snapped = last_horizontal >= 0
+        self.pos[snapped, 0] = snapped_x[last_horizontal[snapped]]
+        movement[snapped, 0] = 0
+
+        ceilings = np.bincount(enemy_ids[below], minlength=count)
+        if tiles:
+            # A ceiling made of several cells slows the enemy down once, see TileGrid.collide
+            ceilings = np.minimum(ceilings, 1)
+        self.speed[:, 1] /= 1.5**ceilings
+        self.on_ground = np.bincount(enemy_ids[above], minlength=count) > 0
+        self.can_move_up = np.bincount(enemy_ids[below], minlength=count) == 0
+        self.can_move_right = np.bincount(enemy_ids[left], minlength=count) == 0
+        self.can_move_left = np.bincount(enemy_ids[right], minlength=count) == 0
+
+        # Integration
+        self.pos += np.round(movement)
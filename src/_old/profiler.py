@@ -0,0 +1,214 @@
+import csv
+import time
+
+import numpy as np
+import pygame
+from fonts import TEXTS
+
+# Phases of a frame, in the order they happen
+FRAME_PHASES = (
+    "update",
+    "draw_background",
+    "draw_static",
+    "draw_actors",
+    "draw_player",
+    "draw_debug",
+    "overlay",
+    "events",
+    "present",
+)
+PHASE_COLORS = (
+    (230, 80, 80),
+    (120, 120, 120),
+    (90, 170, 90),
+    (80, 140, 230),
+    (60, 90, 200),
+    (200, 200, 80),
+    (200, 120, 220),
+    (240, 160, 60),
+    (80, 210, 210),
+)
+
+# Bucket edges of the frame time histograms, in milliseconds
+HISTOGRAM_EDGES = (0, 0.25, 0.5, 1, 2, 4, 8, 16.7, 33.3, 50, 100, float("inf"))
+# Frame time of 60 fps, drawn as a line on the graph
+FRAME_BUDGET = 1000 / 60
+# Width in pixels of a bucket of the frame time histogram drawn next to the graph
+HISTOGRAM_BAR_WIDTH = 8
+
+
+class FrameProfiler:
+    def __init__(self, phases=FRAME_PHASES, colors=PHASE_COLORS, history=240):
+        """
+        Times each phase of the frames. The time between two laps goes to the phase of the second one so the laps
+        only have to be placed at the end of each phase. Frames are timed while the graph is shown or the CSV export
+        is on, otherwise the laps only check the enabled flag
+        Same profiler as engine.window.profiler, the flat imports of the game can't reach the engine package
+        :param phases: names of the phases of a frame, in the order they happen
+        :param colors: color of each phase on the graph, reused when there are more phases than colors
+        :param history: number of frames kept for the graph and the histograms
+        """
+        self.phases = phases
+        self.phase_index = {phase: i for i, phase in enumerate(phases)}
+        self.colors = colors
+        self.history = history
+        self.enabled = False
+        self.show_graph = False
+
+        # Rolling window of the phase times of the last frames in ms, frame_count % history is the next row
+        self.times = np.zeros((history, len(phases)))
+        self.frame_count = 0
+        self.current = [0.0] * len(phases)
+        self.last_lap = 0.0
+
+        self.csv_file = None
+        self.csv_writer = None
+
+        # Surface of the graph and frame_count when it was last drawn
+        self.graph = None
+        self.graph_frame = 0
+
+    def toggle(self):
+        """
+        Shows or hides the graph, the frames stay timed while the CSV export is on
+        """
+        self.show_graph = not self.show_graph
+        self.set_enabled(self.show_graph or self.csv_file is not None)
+
+    def set_enabled(self, enabled):
+        if enabled and not self.enabled:
+            self.last_lap = time.perf_counter()
+        self.enabled = enabled
+
+    def begin_frame(self):
+        if self.enabled:
+            self.last_lap = time.perf_counter()
+
+    def lap(self, phase):
+        if self.enabled:
+            now = time.perf_counter()
+            self.current[self.phase_index[phase]] += (now - self.last_lap) * 1000
+            self.last_lap = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+
+        self.times[self.frame_count % self.history] = self.current
+        if self.csv_writer is not None:
+            self.csv_writer.writerow([self.frame_count, *self.current, sum(self.current)])
+        self.frame_count += 1
+        self.current = [0.0] * len(self.phases)
+
+    def last_frames(self):
+        """
+        :return: the phase times of the frames in the window, oldest first
+        """
+        if self.frame_count < self.history:
+            return self.times[: self.frame_count]
+        return np.roll(self.times, -(self.frame_count % self.history), axis=0)
+
+    def histograms(self, edges=HISTOGRAM_EDGES):
+        """
+        :return: dict of the number of frames in each bucket of edges for each phase and for the whole frame
+        """
+        frames = self.last_frames()
+        result = {phase: np.histogram(frames[:, i], edges)[0] for i, phase in enumerate(self.phases)}
+        result["frame"] = np.histogram(frames.sum(axis=1), edges)[0]
+        return result
+
+    def start_csv(self, path):
+        """
+        Writes the phase times of every frame to a CSV file until stop_csv, the frames are timed even if the graph
+        is hidden
+        """
+        self.stop_csv()
+        self.csv_file = open(path, "w", newline="")  # noqa: SIM115 - kept open while exporting
+        self.csv_writer = csv.writer(self.csv_file)
+        self.csv_writer.writerow(["frame", *self.phases, "total"])
+        self.set_enabled(True)
+
+    def stop_csv(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
+        self.csv_file = None
+        self.csv_writer = None
+        self.set_enabled(self.show_graph)
+
+    def toggle_csv(self, path):
+        if self.csv_file is None:
+            self.start_csv(path)
+        else:
+            self.stop_csv()
+
+    def draw(self, screen, pos=(10, 40), size=(360, 120), scale=2):
+        """
+        Draws the last frames as stacked bars, one color per phase, with the line of the 60 fps budget, the
+        histogram of the frame times on its right and a legend under it
+        :param scale: height in pixels of a millisecond
+        """
+        if not self.show_graph:
+            return
+
+        x, y = pos
+        width, height = size
+        if self.graph is None or self.graph.get_size() != tuple(size):
+            self.graph = pygame.Surface(size)
+            self.graph.set_alpha(200)
+            self.graph_frame = self.frame_count - width
+
+        # The graph scrolls left and only the columns of the frames ended since the last draw are drawn
+        frames = self.last_frames()
+        new = min(self.frame_count - self.graph_frame, width, len(frames))
+        self.graph.scroll(-new, 0)
+        self.graph.fill((0, 0, 0), (width - new, 0, new, height))
+        tops = np.cumsum(frames[len(frames) - new :], axis=1) * scale
+        for column in range(new):
+            bottom = 0
+            for i in range(len(self.phases)):
+                top = int(tops[column, i])
+                if top > bottom:
+                    pygame.draw.line(
+                        self.graph,
+                        self.colors[i % len(self.colors)],
+                        (width - new + column, height - bottom - 1),
+                        (width - new + column, height - top),
+                    )
+                bottom = top
+        self.graph_frame = self.frame_count
+
+        screen.blit(self.graph, pos)
+        budget = y + height - int(FRAME_BUDGET * scale)
+        pygame.draw.line(screen, (255, 255, 255), (x, budget), (x + width - 1, budget))
+        self.draw_histogram(screen, (x + width + 4, y), height)
+
+        # Legend with the mean and the 99th percentile of each phase over the window
+        if len(frames) == 0:
+            return
+        frames = frames[-width:]
+        atlas = TEXTS.atlas(12, (255, 255, 255))
+        line = y + height + 4
+        means = frames.mean(axis=0).tolist()
+        p99s = np.percentile(frames, 99, axis=0).tolist()
+        for i, phase in enumerate(self.phases):
+            pygame.draw.rect(screen, self.colors[i % len(self.colors)], (x, line + 3, 8, 8))
+            screen.blit(TEXTS.render(phase, 12, (255, 255, 255)), (x + 12, line))
+            atlas.draw(screen, f"{means[i]:.2f} {p99s[i]:.2f}", (x + 130, line))
+            line += 14
+
+    def draw_histogram(self, screen, pos, height):
+        """
+        Draws one bar per bucket of HISTOGRAM_EDGES with the number of frames of the window in it, the buckets over
+        the 60 fps budget are red
+        """
+        x, y = pos
+        counts = self.histograms()["frame"]
+        screen.fill((0, 0, 0), (x, y, len(counts) * HISTOGRAM_BAR_WIDTH, height))
+        most = max(int(counts.max()), 1)
+        for i, count in enumerate(counts.tolist()):
+            bar = count * height // most
+            color = (230, 80, 80) if HISTOGRAM_EDGES[i] >= FRAME_BUDGET else (90, 170, 90)
+            screen.fill(color, (x + i * HISTOGRAM_BAR_WIDTH, y + height - bar, HISTOGRAM_BAR_WIDTH - 1, bar))
+
+
+PROFILER = FrameProfiler()
@@ -0,0 +1,140 @@
+import math
+
+import numpy as np
+from actors import Enemy, Player
+from game_objects import Box, Ground, Plateforme
+from levels import is_binary_level, parse_text_level, read_binary_level
+
+
+class LevelStream:
+    def __init__(self, path, chunk_width=32, margin=1):
+        """
+        Splits a level into columns of chunk_width tiles and only keeps the objects of the chunks around the camera
+        in the world. The records of the level stay in flat arrays (mapped in memory for binary levels), what
+        changed on evicted objects (broken boxes, enemies moved or killed) is written back in small dicts
+        :param path: .wd or binary level
+        :param chunk_width: width of a chunk in tiles
+        :param margin: number of chunks loaded on each side of the ones seen by the camera
+        """
+        self.path = path
+        self.chunk_width = chunk_width
+        self.margin = margin
+        self.sections = read_binary_level(path) if is_binary_level(path) else parse_text_level(path)
+
+        # type -> (x of the records sorted, indices of the records in that order, width of the widest record), the
+        # records of a chunk are a slice of it so the index takes two arrays per type whatever the width of the level
+        self.index = {}
+        for obj_type, records in self.sections.items():
+            if obj_type == "P" or len(records) == 0:
+                continue
+            order = np.argsort(records["x"], kind="stable")
+            self.index[obj_type] = (records["x"][order], order, float(np.maximum(records["width"], 1).max()))
+
+        self.loaded_chunks = set()
+        # (type, index) -> object in the world
+        self.objects = {}
+        # State written back when objects are evicted
+        self.broken_boxes = set()
+        self.enemies = {}
+
+    def start(self, world):
+        """
+        Adds the player then the chunks around the camera to the world
+        """
+        for width, height, x, y in self.sections["P"].tolist():
+            world.add_actor(Player(width, height, (x, y) * world.tile_size))
+        self.update(world)
+
+    def record_chunks(self, obj_type, index):
+        record = self.sections[obj_type][index]
+        first = math.floor(record["x"] / self.chunk_width)
+        last = math.floor((record["x"] + max(record["width"], 1) - 1) / self.chunk_width)
+        return range(first, last + 1)
+
+    def chunk_records(self, chunk):
+        """
+        :return: list of (type, index of the record) of the objects overlapping the chunk, in the order of the level
+        """
+        start = chunk * self.chunk_width
+        keys = []
+        for obj_type, (xs, order, widest) in self.index.items():
+            # Records starting in the chunk or close enough before it to reach it
+            first = np.searchsorted(xs, start - widest, side="right")
+            last = np.searchsorted(xs, start + self.chunk_width, side="left")
+            indices = order[first:last]
+            records = self.sections[obj_type][indices]
+            ends = np.floor((records["x"] + np.maximum(records["width"], 1) - 1) / self.chunk_width)
+            keys.extend((obj_type, index) for index in np.sort(indices[ends >= chunk]).tolist())
+        return keys
+
+    def update(self, world):
+        """
+        Loads the chunks entering the margin around the camera and evicts the ones leaving it
+        """
+        tile_width = world.tile_size[0]
+        first = math.floor(world.world_origin[0] / tile_width / self.chunk_width) - self.margin
+        last = math.floor((world.world_origin[0] + world.canvas_size[0]) / tile_width / self.chunk_width) + self.margin
+        wanted = set(range(first, last + 1))
+        if wanted == self.loaded_chunks:
+            return
+
+        leaving = self.loaded_chunks - wanted
+        entering = wanted - self.loaded_chunks
+        self.loaded_chunks = wanted
+
+        for chunk in leaving:
+            for key in self.chunk_records(chunk):
+                if key in self.objects and not any(c in wanted for c in self.record_chunks(*key)):
+                    self.evict(world, key)
+
+        for chunk in entering:
+            for key in self.chunk_records(chunk):
+                if key not in self.objects:
+                    self.load(world, key)
+
+        if world.enemy_batch is not None:
+            world.enemy_batch.rebuild(world.actors)
+
+    def load(self, world, key):
+        obj_type, index = key
+        width, height, x, y = self.sections[obj_type][index].tolist()
+
+        if obj_type == "E":
+            state = self.enemies.get(index)
+            if state is None:
+                obj = Enemy(width, height, (x, y) * world.tile_size)
+            elif state[1] < 1:
+                return
+            else:
+                obj = Enemy(width, height, np.array(state[0]) * world.tile_size)
+                obj.life = state[1]
+            world.add_actor(obj)
+        elif obj_type == "b":
+            obj = Box(int(width), int(height), (x, y))
+            if index in self.broken_boxes:
+                obj.activate()
+            world.add_box(obj)
+        elif obj_type == "g":
+            obj = Ground(int(width), int(height), (x, y))
+            world.add_game_object(obj)
+        elif obj_type == "p":
+            obj = Plateforme(int(width), int(height), (x, y))
+            world.add_game_object(obj)
+        else:
+            return
+
+        self.objects[key] = obj
+
+    def evict(self, world, key):
+        obj_type, index = key
+        obj = self.objects.pop(key)
+
+        if obj_type == "E":
+            # Killed enemies were already removed by the world and are saved with no life so they stay dead
+            self.enemies[index] = ((obj.pos / world.tile_size).tolist(), obj.life)
+            if obj in world.actors:
+                world.remove_actor(obj)
+        else:
+            if obj_type == "b" and obj.isBroken:
+                self.broken_boxes.add(index)
+            world.remove_game_object(obj)
@@ -0,0 +1,51 @@
+from collections import OrderedDict
+
+import pygame
+
+
+class ScaledSurfaceCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """
+        Keeps the scaled copies of the sprites so they are not scaled again on every frame
+        Entries are keyed by source sprite and target size, the least recently used ones are evicted
+        once the scaled surfaces take more than max_bytes
+        :param max_bytes: memory cap of the cached surfaces in bytes
+        """
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        # (id of the sprite, size) -> (sprite, scaled surface, size in bytes)
+        # The sprite is kept in the entry so its id can't be reused by another surface while it is cached
+        self.entries = OrderedDict()
+
+    def get(self, sprite, size):
+        """
+        :param sprite: source surface
+        :param size: (width, height) in pixels
+        :return: the sprite scaled to the size
+        """
+        key = (id(sprite), size)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            return entry[1]
+
+        scaled = pygame.transform.scale(sprite, size)
+        nb_bytes = scaled.get_pitch() * scaled.get_height()
+        self.entries[key] = (sprite, scaled, nb_bytes)
+        self.bytes += nb_bytes
+
+        while self.bytes > self.max_bytes and len(self.entries) > 1:
+            _, (_, _, evicted_bytes) = self.entries.popitem(last=False)
+            self.bytes -= evicted_bytes
+
+        return scaled
+
+    def clear(self):
+        """
+        Drops every scaled surface, used when the window is resized as all the sizes change at once
+        """
+        self.entries.clear()
+        self.bytes = 0
+
+
+SCALED_SURFACES = ScaledSurfaceCache()
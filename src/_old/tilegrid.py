@@ -0,0 +1,282 @@
+import math
+
+import numpy as np
+from game_objects import Box, Plateforme
+
+# Flags of the cells of a TileGrid
+SOLID = 1
+# Only collides with actors landing on it from above
+ONE_WAY = 2
+# Box the player can break by hitting it from below
+BREAKABLE = 4
+
+# Cells added around the level when the grid grows so streaming chunks don't reallocate it every time
+GROW_MARGIN = 64
+
+
+def object_flags(game_obj):
+    """
+    :return: the flags of the cells covered by the game object
+    """
+    if isinstance(game_obj, Plateforme):
+        return ONE_WAY
+    if isinstance(game_obj, Box) and not game_obj.isBroken:
+        return SOLID | BREAKABLE
+    return SOLID
+
+
+class TileGrid:
+    def __init__(self):
+        """
+        Collision layer of the level as one uint8 of flags per tile, so resolving an actor only looks at the cells
+        it touches instead of the objects around it
+        The grid starts at (x0, y0) in tiles, cells[y - y0, x - x0] holds the flags of the tile (x, y)
+        """
+        self.cells = np.zeros((0, 0), dtype=np.uint8)
+        self.x0 = 0
+        self.y0 = 0
+        # (x, y) -> Box, to change the sprite of the box when its cell breaks
+        self.boxes = {}
+
+    def clear(self):
+        self.cells = np.zeros((0, 0), dtype=np.uint8)
+        self.x0 = 0
+        self.y0 = 0
+        self.boxes = {}
+
+    def build(self, game_objects):
+        """
+        Creates the grid of the game objects at once
+        """
+        self.clear()
+        if not game_objects:
+            return
+
+        self.reserve(
+            min(go.x for go in game_objects),
+            min(go.y for go in game_objects),
+            max(go.x + go.width for go in game_objects),
+            max(go.y + go.height for go in game_objects),
+            margin=0,
+        )
+        for go in game_objects:
+            self.add(go)
+
+    def reserve(self, xmin, ymin, xmax, ymax, margin=GROW_MARGIN):
+        """
+        Grows the grid so it holds the tiles from (xmin, ymin) included to (xmax, ymax) excluded
+        """
+        rows, cols = self.cells.shape
+        if rows and cols and xmin >= self.x0 and ymin >= self.y0 and xmax <= self.x0 + cols and ymax <= self.y0 + rows:
+            return
+
+        if rows and cols:
+            x0, y0 = min(xmin - margin, self.x0), min(ymin - margin, self.y0)
+            x1, y1 = max(xmax + margin, self.x0 + cols), max(ymax + margin, self.y0 + rows)
+        else:
+            x0, y0, x1, y1 = xmin - margin, ymin - margin, xmax + margin, ymax + margin
+
+        cells = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        cells[self.y0 - y0 : self.y0 - y0 + rows, self.x0 - x0 : self.x0 - x0 + cols] = self.cells
+        self.cells, self.x0, self.y0 = cells, x0, y0
+
+    def add(self, game_obj):
+        x, y, width, height = int(game_obj.x), int(game_obj.y), int(game_obj.width), int(game_obj.height)
+        self.reserve(x, y, x + width, y + height)
+        self.cells[y - self.y0 : y - self.y0 + height, x - self.x0 : x - self.x0 + width] |= object_flags(game_obj)
+        if isinstance(game_obj, Box):
+            self.boxes[(x, y)] = game_obj
+
+    def remove(self, game_obj, x_index):
+        """
+        Clears the cells of the object then gives back their flags to the other objects covering them
+        :param x_index: XIndex of the objects left in the world, the object must already be removed from it
+        """
+        x, y, width, height = int(game_obj.x), int(game_obj.y), int(game_obj.width), int(game_obj.height)
+        self.cells[y - self.y0 : y - self.y0 + height, x - self.x0 : x - self.x0 + width] = 0
+        self.boxes.pop((x, y), None)
+
+        for go in x_index.query(x, x + width):
+            # Part of the other object inside the cleared area
+            go_x, go_y = int(go.x), int(go.y)
+            x1, y1 = max(go_x, x), max(go_y, y)
+            x2, y2 = min(go_x + int(go.width), x + width), min(go_y + int(go.height), y + height)
+            if x1 < x2 and y1 < y2:
+                self.cells[y1 - self.y0 : y2 - self.y0, x1 - self.x0 : x2 - self.x0] |= object_flags(go)
+
+    def flags(self, x, y):
+        """
+        :return: the flags of the tile (x, y), 0 outside of the grid
+        """
+        row, col = y - self.y0, x - self.x0
+        rows, cols = self.cells.shape
+        if 0 <= row < rows and 0 <= col < cols:
+            return int(self.cells[row, col])
+        return 0
+
+    def break_cell(self, x, y):
+        """
+        The box of the tile stays solid but can't be broken again
+        """
+        self.cells[y - self.y0, x - self.x0] &= ~np.uint8(BREAKABLE)
+        box = self.boxes.get((x, y))
+        if box is not None:
+            box.activate()
+
+    def window(self, xmin, ymin, xmax, ymax):
+        """
+        :return: (cols, rows, cells) the non-empty cells of the tiles from (xmin, ymin) to (xmax, ymax) included,
+            clipped to the grid, rows first from the bottom
+        """
+        rows, cols = self.cells.shape
+        col0, col1 = max(xmin - self.x0, 0), min(xmax - self.x0, cols - 1)
+        row0, row1 = max(ymin - self.y0, 0), min(ymax - self.y0, rows - 1)
+        if col0 > col1 or row0 > row1:
+            return (), (), ()
+
+        window = self.cells[row0 : row1 + 1, col0 : col1 + 1]
+        found_rows, found_cols = np.nonzero(window)
+        return (
+            (found_cols + col0 + self.x0).tolist(),
+            (found_rows + row0 + self.y0).tolist(),
+            window[found_rows, found_cols].tolist(),
+        )
+
+    def collide(self, actor, tile_size, can_break=False):
+        """
+        Same rules as Actor.check_position_collisions with each cell as a 1x1 object, only the cells the actor
+        touches at its next position are looked at. Everything is tested from the position the actor has before
+        moving, and on each axis the last cell touched sets its position like in EnemyBatch.step
+        One-way cells only stop actors landing on them
+        :param can_break: whether the actor breaks the breakable cells it hits from below while jumping
+        """
+        tw, th = tile_size[0], tile_size[1]
+        x, y = actor.pos[0], actor.pos[1]
+        width, height = actor.width * tw, actor.height * th
+        next_x, next_y = x + round(actor.speed[0]), y + round(actor.speed[1])
+
+        on_ground = False
+        can_move_up = True
+        can_move_right = True
+        can_move_left = True
+        jumping = actor.jumping
+        snapped_x, snapped_y = None, None
+        ceiling = False
+
+        # Columns overlapping the actor and rows touching it, like the x and y overlap tests
+        cols, rows, flags = self.window(
+            math.floor(next_x / tw),
+            math.ceil(next_y / th) - 1,
+            math.ceil((next_x + width) / tw) - 1,
+            math.floor((next_y + height) / th),
+        )
+        for cx, cy, cell in zip(cols, rows, flags):
+            left_edge, bottom = cx * tw, cy * th
+            right_edge, top = left_edge + tw, bottom + th
+            if not (next_x < right_edge and next_x + width > left_edge and next_y <= top and next_y + height >= bottom):
+                continue
+
+            if y >= top:
+                on_ground = True
+                snapped_y = top
+            elif cell & ONE_WAY:
+                continue
+            elif y + height <= bottom:
+                can_move_up = False
+                jumping = False
+                snapped_y = bottom - height
+                ceiling = True
+                if cell & BREAKABLE and can_break and actor.jumping:
+                    self.break_cell(cx, cy)
+            elif x + width <= left_edge:
+                can_move_right = False
+                snapped_x = left_edge - width
+            elif x >= right_edge:
+                can_move_left = False
+                snapped_x = right_edge
+
+        if snapped_x is not None:
+            actor.pos[0] = snapped_x
+            actor.movement_speed[0] = 0
+        if snapped_y is not None:
+            actor.pos[1] = snapped_y
+            actor.movement_speed[1] = 0
+        # A ceiling made of several cells slows the actor down once, like a single object
+        if ceiling:
+            actor.speed[1] /= 1.5
+
+        actor.on_ground = on_ground
+        actor.can_move_up = can_move_up
+        actor.can_move_right = can_move_right
+        actor.can_move_left = can_move_left
+        actor.can_uncrouch = not actor.crouched or self.can_stand(actor, next_x, tile_size)
+        actor.jumping = jumping
+
+    def can_stand(self, actor, x, tile_size):
+        """
+        :return: whether the cells above a crouched actor leave room for its full height
+        """
+        tw, th = tile_size[0], tile_size[1]
+        bottom = actor.pos[1] + actor.height * th
+        top = actor.pos[1] + actor.full_height * th
+        if top <= bottom:
+            return True
+
+        _, _, flags = self.window(
+            math.floor(x / tw),
+            math.floor(bottom / th),
+            math.ceil((x + actor.width * tw) / tw) - 1,
+            math.ceil(top / th) - 1,
+        )
+        return not any(cell & SOLID for cell in flags)
+
+    def query_boxes(self, xmin, ymin, xmax, ymax):
+        """
+        Vectorized window for many areas at once, like SpatialHash.query_boxes
+        :param xmin, ymin, xmax, ymax: arrays of areas in tiles, the cells touching their edges are included
+        :return: (box_indices, cell_indices) arrays of the non-empty cells of each area sorted by box then by cell,
+            cell indices are flat indices of cells
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        rows, cols = self.cells.shape
+        if rows == 0 or cols == 0 or len(xmin) == 0:
+            return empty, empty
+
+        col0 = np.maximum(np.ceil(np.asarray(xmin)).astype(np.int64) - 1 - self.x0, 0)
+        col1 = np.minimum(np.floor(np.asarray(xmax)).astype(np.int64) - self.x0, cols - 1)
+        row0 = np.maximum(np.ceil(np.asarray(ymin)).astype(np.int64) - 1 - self.y0, 0)
+        row1 = np.minimum(np.floor(np.asarray(ymax)).astype(np.int64) - self.y0, rows - 1)
+        span_x = col1 - col0 + 1
+        span_y = row1 - row0 + 1
+        if len(span_x) == 0 or span_x.max() <= 0 or span_y.max() <= 0:
+            return empty, empty
+
+        flat = self.cells.ravel()
+        boxes = []
+        found = []
+        box_ids = np.arange(len(col0))
+        for dy in range(int(span_y.max())):
+            for dx in range(int(span_x.max())):
+                valid = (dx < span_x) & (dy < span_y)
+                cells = (row0[valid] + dy) * cols + col0[valid] + dx
+                filled = flat[cells] != 0
+                boxes.append(box_ids[valid][filled])
+                found.append(cells[filled])
+
+        pairs = np.concatenate(boxes) * flat.size + np.concatenate(found)
+        pairs.sort()
+        return pairs // flat.size, pairs % flat.size
+
+    def cell_rects(self, cells):
+        """
+        :param cells: flat indices of cells
+        :return: (x, y, width, height) in tiles of the cells
+        """
+        rows, cols = np.divmod(cells, self.cells.shape[1])
+        rects = np.ones((len(cells), 4))
+        rects[:, 0] = cols + self.x0
+        rects[:, 1] = rows + self.y0
+        return rects
+
+    def cell_flags(self, cells):
+        return self.cells.ravel()[cells]
@@ -0,0 +1,120 @@
+import math
+from collections import OrderedDict
+
+import pygame
+from pygame.locals import RLEACCEL
+
+# Color filling the empty parts of the chunks, made transparent when blitting them
+CHUNK_COLORKEY = (255, 0, 255)
+
+
+class StaticLayer:
+    def __init__(self, chunk_size=16, max_chunks=256):
+        """
+        Pre-renders the static gameObjects into square chunks of chunk_size tiles, only the chunks
+        intersecting the view are blitted on each frame and a chunk is baked again only when its content changes
+        :param chunk_size: width and height of a chunk in tiles
+        :param max_chunks: number of baked chunks kept, the least recently drawn ones are dropped first
+        """
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        # (cx, cy) -> list of gameObjects overlapping the chunk, in insertion order
+        self.chunks = {}
+        # (cx, cy) -> baked surface
+        self.surfaces = OrderedDict()
+        self.tile_size = None
+
+    def clear(self):
+        for objects in self.chunks.values():
+            for game_obj in objects:
+                game_obj.static_layer = None
+        self.chunks = {}
+        self.surfaces.clear()
+
+    def chunks_of(self, game_obj):
+        """
+        :return: the coordinates of the chunks covered by the object
+        """
+        cx0 = math.floor(game_obj.x / self.chunk_size)
+        cy0 = math.floor(game_obj.y / self.chunk_size)
+        cx1 = math.ceil((game_obj.x + game_obj.width) / self.chunk_size) - 1
+        cy1 = math.ceil((game_obj.y + game_obj.height) / self.chunk_size) - 1
+        return [(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)]
+
+    def add(self, game_obj):
+        game_obj.static_layer = self
+        for chunk in self.chunks_of(game_obj):
+            self.chunks.setdefault(chunk, []).append(game_obj)
+            self.surfaces.pop(chunk, None)
+
+    def remove(self, game_obj):
+        game_obj.static_layer = None
+        for chunk in self.chunks_of(game_obj):
+            objects = self.chunks.get(chunk)
+            if objects is not None and game_obj in objects:
+                objects.remove(game_obj)
+                if not objects:
+                    del self.chunks[chunk]
+            self.surfaces.pop(chunk, None)
+
+    def invalidate(self, game_obj):
+        """
+        Marks the chunks holding the object to be baked again, called when its sprite changes
+        """
+        for chunk in self.chunks_of(game_obj):
+            self.surfaces.pop(chunk, None)
+
+    def bake(self, chunk, tile_size):
+        cx, cy = chunk
+        size = self.chunk_size
+        surface = pygame.Surface((size * tile_size[0], size * tile_size[1]))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        surface.fill(CHUNK_COLORKEY)
+
+        for game_obj in self.chunks[chunk]:
+            game_obj.bake(
+                surface,
+                (
+                    (game_obj.x - cx * size) * tile_size[0],
+                    ((cy + 1) * size - (game_obj.y + game_obj.height)) * tile_size[1],
+                ),
+                game_obj.width * tile_size[0],
+                game_obj.height * tile_size[1],
+            )
+
+        surface.set_colorkey(CHUNK_COLORKEY, RLEACCEL)
+        return surface
+
+    def draw(self, screen, world_origin, tile_size):
+        """
+        Blits the chunks visible on the screen, world_origin being the world coordinates of the top left corner
+        """
+        tile_size = (int(tile_size[0]), int(tile_size[1]))
+        if tile_size != self.tile_size:
+            self.surfaces.clear()
+            self.tile_size = tile_size
+
+        chunk_width = self.chunk_size * tile_size[0]
+        chunk_height = self.chunk_size * tile_size[1]
+        cx0 = math.floor(world_origin[0] / chunk_width)
+        cx1 = math.floor((world_origin[0] + screen.get_width() - 1) / chunk_width)
+        cy0 = math.floor((world_origin[1] - screen.get_height()) / chunk_height)
+        cy1 = math.floor((world_origin[1] - 1) / chunk_height)
+
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                chunk = (cx, cy)
+                if chunk not in self.chunks:
+                    continue
+
+                surface = self.surfaces.get(chunk)
+                if surface is None:
+                    surface = self.bake(chunk, tile_size)
+                    self.surfaces[chunk] = surface
+                    if len(self.surfaces) > self.max_chunks:
+                        self.surfaces.popitem(last=False)
+                else:
+                    self.surfaces.move_to_end(chunk)
+
+                screen.blit(surface, (cx * chunk_width - world_origin[0], world_origin[1] - (cy + 1) * chunk_height))
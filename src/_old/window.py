@@ -3,10 +3,11 @@ from logging import Logger
 
 import numpy as np
 import pygame as pg
-from camera import CAMERA_TRIGGER
+from assets import ASSETS
 from component import EDITOR_EVENT, GAME_EVENT, MENU_EVENT
-from constants import WORLDS_PATH
+from constants import SPRITE_PATHS, WORLDS_PATH
 from editor import BLOCK_TYPE, GROUND_TYPE, PLAYER_TYPE, Editor
+from fonts import TEXTS
 from overlay import (
     CHANGE_MODE,
     EDITOR_ID,
@@ -23,6 +24,8 @@ from overlay import (
 from pygame.locals import (
     DOUBLEBUF,
     K_ESCAPE,
+    K_F8,
+    K_F9,
     K_F10,
     K_TAB,
     KEYDOWN,
@@ -33,11 +36,14 @@ from pygame.locals import (
     RESIZABLE,
     SWSURFACE,
     VIDEORESIZE,
+    K_c,
     K_g,
     K_r,
     K_t,
     K_y,
 )
+from profiler import PROFILER
+from surfaces import SCALED_SURFACES
 
 from game import Game
 
@@ -45,6 +51,9 @@ GAME_STATE = 0
 MAIN_MENU = 1
 EDITOR_MODE = 2
 BASESIZE = (1280, 720)
+MENU_BACKGROUND = (50, 50, 50)
+# Per frame phase times written by the profiler, F8 starts and stops the export
+PROFILE_CSV_PATH = "frame_profile.csv"
 
 _logger = Logger("WindowLogger")
 _logger.setLevel("INFO")
@@ -64,10 +73,16 @@ class Window:
 
         self.should_close = False
         self.debug_mode = False
+        # Only present the parts of the screen that changed when the screen is mostly static (menus)
+        self.dirty_rects_mode = True
+        self.drawn_state = None
+        # Whether the profiler graph was drawn over the last frame, the menu is drawn again entirely under it
+        self.graph_drawn = False
         self.is_grid_drawn = False
         self.tile_size = np.array((self.width // 48, self.height // 27)) * self.scale
 
         self.screen = pg.display.set_mode((self.width, self.height))
+        ASSETS.preload(SPRITE_PATHS)
 
         self.state = MAIN_MENU
         self.game = Game((self.width, self.height), self.tile_size, self.scale)
@@ -87,10 +102,7 @@ class Window:
         self.game.draw(self.screen)
 
         if self.debug_mode:
-            self.screen.blit(
-                pg.font.SysFont("Consolas", 14, bold=True).render("fps : {0}".format(self.fps), False, (0, 0, 0)),
-                (0, 20),
-            )
+            TEXTS.atlas(14, (0, 0, 0), bold=True).draw(self.screen, "fps : {0}".format(self.fps), (0, 20))
 
     def draw_menu(self):
         """
@@ -106,6 +118,16 @@ class Window:
         """
         self.game.pause_sverlay.draw(self.screen)
 
+    def present(self, rects):
+        """
+        Shows what was drawn during the frame
+        :param rects: the areas that changed, None when the whole screen changed
+        """
+        if rects is None:
+            pg.display.flip()
+        elif rects:
+            pg.display.update(rects)
+
     def get_keys(self):
         """
         :return: list of keys pressed
@@ -126,6 +148,7 @@ class Window:
         self.height = height
         self.tile_size = np.array((self.width // 48, self.height // 27)) * self.scale
         self.size_ratio = np.array((self.width, self.height)) / BASESIZE
+        SCALED_SURFACES.clear()
         if self.state == MAIN_MENU:
             self.menu.resize(width, height)
         elif self.state == GAME_STATE:
@@ -144,13 +167,15 @@ class Window:
             if event.type == QUIT:
                 self.should_close = True
 
+            if event.type == KEYDOWN and event.key == K_F9:
+                PROFILER.toggle()
+            if event.type == KEYDOWN and event.key == K_F8:
+                PROFILER.toggle_csv(PROFILE_CSV_PATH)
+
             if self.state == GAME_STATE:
                 if event.type == VIDEORESIZE:
                     self.resize(event.__dict__["w"], event.__dict__["h"])
 
-                if event.type == CAMERA_TRIGGER:
-                    self.game.move_camera(event.__dict__["dx"], event.__dict__["dy"])
-
                 if event.type == MENU_EVENT:
                     event_id = event.__dict__["id"]
 
@@ -183,6 +208,9 @@ class Window:
                     if event.key == K_r:
                         self.game.reset()
 
+                    if event.key == K_c:
+                        self.game.cycle_camera_mode()
+
                     if event.key == K_t:
                         self.target_fps += 5
 
@@ -254,7 +282,7 @@ class Window:
                         self.editor.pause = False
 
                     elif event_id == SAVE_ID:
-                        pass
+                        self.editor.save()
 
                     elif event_id == MAIN_MENU_ID:
                         self.state = MAIN_MENU
@@ -277,16 +305,24 @@ class Window:
         """
         while not self.should_close:
             self.clock.tick(self.target_fps)
+            PROFILER.begin_frame()
             self.update()
+            rects = None
 
             if self.state == MAIN_MENU:
-                self.screen.fill((50, 50, 50))
-                self.draw_menu()
+                if self.dirty_rects_mode:
+                    if self.drawn_state != MAIN_MENU or self.graph_drawn:
+                        self.menu.mark_dirty()
+                    rects = self.menu.draw_dirty(self.screen, MENU_BACKGROUND)
+                else:
+                    self.screen.fill(MENU_BACKGROUND)
+                    self.draw_menu()
 
             elif self.state == GAME_STATE:
                 if self.fps > 0:
                     if not self.game.pause:
                         self.game.update(self.get_keys(), self.clock.get_time() / 1000, self.size_ratio)
+                        PROFILER.lap("update")
                         self.draw_game()
 
                     else:
@@ -301,8 +337,20 @@ class Window:
                 if self.editor.pause:
                     self.editor.draw_pause_overlay(self.screen)
 
+            self.graph_drawn = PROFILER.show_graph
+            if self.graph_drawn:
+                PROFILER.draw(self.screen)
+                rects = None
+            PROFILER.lap("overlay")
+
+            self.drawn_state = self.state
             self.handle_events()
-            pg.display.flip()
+            PROFILER.lap("events")
+            self.present(rects)
+            PROFILER.lap("present")
+            PROFILER.end_frame()
+
+        PROFILER.stop_csv()
 
 
 if __name__ == "__main__":
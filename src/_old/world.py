@@ -1,7 +1,17 @@
 import numpy as np
+import pygame
 from actors import Actor, Enemy, Player
 from camera import Camera
+from collision import SpatialHash, SweepAndPrune, XIndex
 from game_objects import Box, GameObject, Ground, Plateforme
+from levels import is_binary_level, read_binary_level
+from loading import LevelLoader
+from physics import EnemyBatch
+from profiler import PROFILER
+from streaming import LevelStream
+from surfaces import SCALED_SURFACES
+from tilegrid import TileGrid
+from tilemap import StaticLayer
 
 
 class World:
@@ -19,6 +29,26 @@ class World:
         self.game_objects = []
         self.actors = []
         self.player = None
+        # Broadphase over game_objects used by the actors' collisions
+        self.collision_grid = SpatialHash()
+        # Broadphase over the player and actors used by actor vs actor contacts
+        self.actor_contacts = SweepAndPrune()
+        # Game objects sorted by x, the ones on screen are found with binary searches
+        self.x_index = XIndex()
+        # Game objects flagged on_screen on the last update and x_index.version when they were
+        self.visible_objects = []
+        self.visible_version = -1
+        # When set, actors collide with the tiles of this grid instead of the game objects of collision_grid
+        self.tile_grid = None
+        # When set, enemies physics run all at once on arrays instead of calling Enemy.update
+        self.enemy_batch = None
+        # Pre-rendered chunks of the game objects
+        self.static_layer = StaticLayer()
+        # LevelStream loading the level around the camera, None when the whole level is loaded
+        self.stream = None
+        # Levels loaded in the background and the one to swap in once it's loaded
+        self.loader = LevelLoader()
+        self.pending_level = None
 
         if self.level is not None:
             self.read_world(level)
@@ -32,6 +62,11 @@ class World:
         if isinstance(game_obj, GameObject):
             self.game_objects.append(game_obj)
             self.objects.append(game_obj)
+            self.collision_grid.insert(game_obj)
+            self.x_index.add(game_obj)
+            if self.tile_grid is not None:
+                self.tile_grid.add(game_obj)
+            self.static_layer.add(game_obj)
 
     def add_actor(self, actor):
         """
@@ -45,6 +80,32 @@ class World:
         else:
             self.actors.append(actor)
             self.objects.append(actor)
+        self.actor_contacts.add(actor)
+
+    def remove_game_object(self, game_obj):
+        """
+        Removes the gameObject (or box) from the corresponding lists
+        """
+        self.game_objects.remove(game_obj)
+        self.objects.remove(game_obj)
+        if game_obj in self.boxes:
+            self.boxes.remove(game_obj)
+        self.collision_grid.remove(game_obj)
+        self.x_index.remove(game_obj)
+        if self.tile_grid is not None:
+            self.tile_grid.remove(game_obj, self.x_index)
+        self.static_layer.remove(game_obj)
+
+    def remove_actor(self, actor):
+        """
+        Removes the actor from the corresponding lists
+        """
+        if actor is self.player:
+            self.player = None
+        else:
+            self.actors.remove(actor)
+        self.objects.remove(actor)
+        self.actor_contacts.remove(actor)
 
     def add_box(self, box):
         """
@@ -56,6 +117,31 @@ class World:
             self.game_objects.append(box)
             self.boxes.append(box)
             self.objects.append(box)
+            self.collision_grid.insert(box)
+            self.x_index.add(box)
+            if self.tile_grid is not None:
+                self.tile_grid.add(box)
+            self.static_layer.add(box)
+
+    def switch_batched_enemies(self):
+        """
+        Switches between the scalar Enemy.update path and the vectorized EnemyBatch one
+        """
+        if self.enemy_batch is None:
+            self.enemy_batch = EnemyBatch(self.actors)
+        else:
+            self.enemy_batch.write_back()
+            self.enemy_batch = None
+
+    def switch_tile_collisions(self):
+        """
+        Switches between the collisions against the game objects and the ones against the TileGrid of the level
+        """
+        if self.tile_grid is None:
+            self.tile_grid = TileGrid()
+            self.tile_grid.build(self.game_objects)
+        else:
+            self.tile_grid = None
 
     def resize(self, window_size, tile_size):
         """
@@ -88,59 +174,184 @@ class World:
         self.canvas_size = window_size
         self.tile_size = tile_size
         self.camera.resize(window_size, tile_size)
+        SCALED_SURFACES.clear()
+        # The levels loading in the background were created with the previous tile size
+        self.loader.restart()
 
-    def change_level(self, new_level):
-        """Made for code clarity"""
-        self.read_world(new_level)
+    def change_level(self, new_level, background=True):
+        """
+        :param background: keep the current level running while the new one loads, it's swapped in once loaded
+        """
+        if self.stream is not None:
+            self.level = new_level
+            self.stream_world(new_level, self.stream.chunk_width, self.stream.margin)
+        elif background:
+            self.pending_level = self.prefetch_level(new_level)
+        else:
+            self.load_level(new_level)
 
     def reset_world(self):
         """Made for code clarity"""
-        self.read_world(self.level)
         self.camera.reset()
         self.world_origin = np.array((0, self.canvas_size[1]))
+        if self.stream is not None:
+            self.stream_world(self.level, self.stream.chunk_width, self.stream.margin)
+        else:
+            self.load_level(self.level)
 
-    def read_world(self, fic):
+    def prefetch_level(self, fic):
         """
-        Parse and reads the file that contains formatted data about the world
-        Format example : type width height x y
-        Types : g (Ground), P (Player), E (Enemy), b (Box), p (Platform)
-        Case matters !
+        Starts loading a level in the background, a later change_level or reset_world to that level won't have to
+        read it
+        :return: the LoadingJob of the level
+        """
+        return self.loader.prefetch(fic)
+
+    def staging_world(self):
+        """
+        :return: an empty World the levels are loaded in before being swapped in
         """
+        return World(self.canvas_size, self.tile_size, self.scale)
+
+    def load_level(self, fic):
+        """
+        Uses the level if it was prefetched, finishing to load it if needed, reads it otherwise
+        Another copy of the level starts loading right away so the next reset doesn't read it again
+        """
+        world = self.loader.take(fic, self.staging_world)
+        if world is not None:
+            self.swap_in(world)
+        else:
+            self.read_world(fic)
+
+        if fic != self.level:
+            self.loader.drop(self.level)
+        self.level = fic
+        self.prefetch_level(fic)
+
+    def swap_in(self, world):
+        """
+        Takes the objects of a world loaded in the background, done between two frames so the swap is atomic
+        """
+        self.objects = world.objects
+        self.boxes = world.boxes
+        self.game_objects = world.game_objects
+        self.actors = world.actors
+        self.player = world.player
+        self.collision_grid = world.collision_grid
+        self.actor_contacts = world.actor_contacts
+        self.x_index = world.x_index
+        self.visible_objects = []
+        self.visible_version = -1
+        self.static_layer = world.static_layer
+        self.stream = None
+
+        if self.enemy_batch is not None:
+            self.enemy_batch = EnemyBatch(self.actors)
+        if self.tile_grid is not None:
+            self.tile_grid.build(self.game_objects)
+
+    def loading_progress(self):
+        """
+        :return: progress between 0 and 1 of the level loading in the background, None if there is none
+        """
+        if self.pending_level is None:
+            return None
+        return self.pending_level.progress
+
+    def clear_world(self):
         self.objects = []
         self.boxes = []
         self.game_objects = []
         self.actors = []
         self.player = None
+        self.collision_grid.clear()
+        self.actor_contacts.clear()
+        self.x_index.clear()
+        self.visible_objects = []
+        if self.tile_grid is not None:
+            self.tile_grid.clear()
+        self.static_layer.clear()
+
+    def stream_world(self, fic, chunk_width=32, margin=1):
+        """
+        Loads the level chunk by chunk around the camera instead of all at once, see LevelStream
+        :param chunk_width: width of a chunk in tiles
+        :param margin: number of chunks kept loaded on each side of the screen
+        """
+        self.clear_world()
         if self.level is None:
             self.level = fic
 
-        f = open(fic, "r")
-        for line in f.readlines():
-            # type width height posx posy
-            tmp = line.split()
-            if len(tmp) == 5:
-                if tmp[0] == "p":
-                    self.add_game_object(Plateforme(int(tmp[1]), int(tmp[2]), (int(tmp[3]), int(tmp[4]))))
-                elif tmp[0] == "g":
-                    self.add_game_object(Ground(int(tmp[1]), int(tmp[2]), (int(tmp[3]), int(tmp[4]))))
-                elif tmp[0] == "P":
-                    self.add_actor(
-                        Player(
-                            float(tmp[1]),
-                            float(tmp[2]),
-                            (int(tmp[3]), int(tmp[4])) * self.tile_size,
+        self.stream = LevelStream(fic, chunk_width, margin)
+        self.stream.start(self)
+        if self.enemy_batch is not None:
+            self.enemy_batch = EnemyBatch(self.actors)
+
+    def read_world(self, fic):
+        """
+        Parse and reads the file that contains formatted data about the world
+        Format example : type width height x y
+        Types : g (Ground), P (Player), E (Enemy), b (Box), p (Platform)
+        Case matters !
+        Binary levels (see levels.py) are also accepted
+        """
+        self.clear_world()
+        self.stream = None
+        if self.level is None:
+            self.level = fic
+
+        if is_binary_level(fic):
+            self.add_level_sections(read_binary_level(fic))
+        else:
+            f = open(fic, "r")
+            for line in f.readlines():
+                # type width height posx posy
+                tmp = line.split()
+                if len(tmp) == 5:
+                    if tmp[0] == "p":
+                        self.add_game_object(Plateforme(int(tmp[1]), int(tmp[2]), (int(tmp[3]), int(tmp[4]))))
+                    elif tmp[0] == "g":
+                        self.add_game_object(Ground(int(tmp[1]), int(tmp[2]), (int(tmp[3]), int(tmp[4]))))
+                    elif tmp[0] == "P":
+                        self.add_actor(
+                            Player(
+                                float(tmp[1]),
+                                float(tmp[2]),
+                                (int(tmp[3]), int(tmp[4])) * self.tile_size,
+                            )
                         )
-                    )
-                elif tmp[0] == "b":
-                    self.add_box(Box(int(tmp[1]), int(tmp[2]), (int(tmp[3]), int(tmp[4]))))
-                elif tmp[0] == "E":
-                    self.add_actor(
-                        Enemy(
-                            float(tmp[1]),
-                            float(tmp[2]),
-                            (int(tmp[3]), int(tmp[4])) * self.tile_size,
+                    elif tmp[0] == "b":
+                        self.add_box(Box(int(tmp[1]), int(tmp[2]), (int(tmp[3]), int(tmp[4]))))
+                    elif tmp[0] == "E":
+                        self.add_actor(
+                            Enemy(
+                                float(tmp[1]),
+                                float(tmp[2]),
+                                (int(tmp[3]), int(tmp[4])) * self.tile_size,
+                            )
                         )
-                    )
+
+        if self.enemy_batch is not None:
+            self.enemy_batch = EnemyBatch(self.actors)
+
+    def add_level_sections(self, sections):
+        """
+        Creates the objects of a binary level
+        :param sections: dict of the records (width, height, x, y) of each object type
+        """
+        for obj_type, records in sections.items():
+            for width, height, x, y in records.tolist():
+                if obj_type == "p":
+                    self.add_game_object(Plateforme(int(width), int(height), (x, y)))
+                elif obj_type == "g":
+                    self.add_game_object(Ground(int(width), int(height), (x, y)))
+                elif obj_type == "P":
+                    self.add_actor(Player(width, height, (x, y) * self.tile_size))
+                elif obj_type == "b":
+                    self.add_box(Box(int(width), int(height), (x, y)))
+                elif obj_type == "E":
+                    self.add_actor(Enemy(width, height, (x, y) * self.tile_size))
 
     def switch_debug_mode(self):
         self.debug_mode = not self.debug_mode
@@ -156,7 +367,7 @@ class World:
             return (obj.pos + (0, obj.height) * self.tile_size - self.world_origin) * np.array((1, -1))
 
         elif isinstance(obj, GameObject):
-            return ((obj.pos + (0, obj.height)) * self.tile_size - self.world_origin) * np.array((1, -1))
+            return ((obj.x, obj.y + obj.height) * self.tile_size - self.world_origin) * np.array((1, -1))
 
         elif isinstance(obj, Camera):
             # return (pos, rect) position of the camera and boundaries
@@ -182,14 +393,21 @@ class World:
         :return:
         """
         screen.fill(self.background_color)
+        PROFILER.lap("draw_background")
 
-        for go in self.game_objects:
-            go.draw(
-                screen,
-                self.calculate_drawing_coordinates(go),
-                go.width * self.tile_size[0],
-                go.height * self.tile_size[1],
-            )
+        # The debug mode draws every object one by one to show their origin
+        if self.debug_mode:
+            view_left = self.world_origin[0] / self.tile_size[0]
+            for go in self.x_index.query(view_left, view_left + self.canvas_size[0] / self.tile_size[0]):
+                go.draw(
+                    screen,
+                    self.calculate_drawing_coordinates(go),
+                    go.width * self.tile_size[0],
+                    go.height * self.tile_size[1],
+                )
+        else:
+            self.static_layer.draw(screen, self.world_origin, self.tile_size)
+        PROFILER.lap("draw_static")
 
         for actor in self.actors:
             if isinstance(actor, Actor):
@@ -199,6 +417,7 @@ class World:
                     actor.width * self.tile_size[0],
                     actor.height * self.tile_size[1],
                 )
+        PROFILER.lap("draw_actors")
 
         if self.player is not None:
             self.player.draw(
@@ -207,35 +426,76 @@ class World:
                 self.player.width * self.tile_size[0],
                 self.player.height * self.tile_size[1],
             )
+        PROFILER.lap("draw_player")
 
         if self.debug_mode:
             self.camera.draw(screen)
 
+        progress = self.loading_progress()
+        if progress is not None:
+            bar = pygame.Rect(0, 0, self.canvas_size[0] // 3, 12)
+            bar.midbottom = (self.canvas_size[0] // 2, self.canvas_size[1] - 20)
+            pygame.draw.rect(screen, (255, 255, 255), bar, 2)
+            pygame.draw.rect(screen, (255, 255, 255), (bar.x, bar.y, int(bar.width * progress), bar.height))
+        PROFILER.lap("draw_debug")
+
+    def update_visible_objects(self, left):
+        """
+        Flags the game objects crossing the screen as on_screen and the others not, only the objects that were on
+        screen on the last update are reset unless objects were added or removed since
+        :param left: x of the left edge of the screen in pixels
+        """
+        visible = self.x_index.query(left / self.tile_size[0], (left + self.canvas_size[0]) / self.tile_size[0])
+
+        if self.visible_version != self.x_index.version:
+            for go in self.game_objects:
+                go.on_screen = False
+            self.visible_version = self.x_index.version
+        else:
+            for go in self.visible_objects:
+                go.on_screen = False
+
+        for go in visible:
+            go.on_screen = True
+        self.visible_objects = visible
+
     def update(self, keys, dt, size_ratio):
+        self.loader.step(self.staging_world, self.pending_level)
+        if self.pending_level is not None and self.pending_level.complete():
+            self.load_level(self.pending_level.path)
+            self.pending_level = None
+
+        if self.stream is not None:
+            self.stream.update(self)
+
         camera_offset_left = self.camera.xmin - (self.camera.initialValues[0] * self.tile_size[0])
-        for go in self.game_objects:
-            if (go.pos[0] + go.width) * self.tile_size[0] > camera_offset_left and go.pos[
-                0
-            ] < camera_offset_left + self.canvas_size[0]:
-                go.on_screen = True
-            else:
-                go.on_screen = False
+        collisions = self.collision_grid if self.tile_grid is None else self.tile_grid
 
-        for actor in self.actors:
-            if (
-                actor.pos[0] + (actor.width * self.tile_size[0]) > camera_offset_left
-                and actor.pos[0] < camera_offset_left + self.canvas_size[0]
-            ):
-                actor.on_screen = True
-            else:
-                actor.on_screen = False
+        if self.enemy_batch is not None:
+            self.update_enemy_batch(dt, size_ratio, collisions, camera_offset_left)
+            contacts = self.enemy_batch
+        else:
+            for actor in self.actors:
+                if (
+                    actor.pos[0] + (actor.width * self.tile_size[0]) > camera_offset_left
+                    and actor.pos[0] < camera_offset_left + self.canvas_size[0]
+                ):
+                    actor.on_screen = True
+                else:
+                    actor.on_screen = False
 
-            if actor.life < 1:
-                self.actors.remove(actor)
+                if actor.life < 1:
+                    self.actors.remove(actor)
+                    self.actor_contacts.remove(actor)
 
-            actor.update(dt, size_ratio, self.game_objects, self.tile_size, self.scale)
+                actor.update(dt, size_ratio, collisions, self.tile_size, self.scale)
 
-        self.camera.check_player_pos(self.player)
+            # Enemies are resolved between themselves and the player only tests the actors it may touch
+            self.actor_contacts.update(self.tile_size)
+            for actor, other in self.actor_contacts.pairs():
+                if actor is not self.player and other is not self.player:
+                    actor.separate(other, self.tile_size)
+            contacts = self.actor_contacts
 
         if self.player.pos[1] + self.player.height * self.tile_size[1] < 0 or self.player.life <= 0:
             self.reset_world()
@@ -244,12 +504,35 @@ class World:
             keys,
             dt,
             size_ratio,
-            self.game_objects,
-            self.actors,
+            collisions,
+            contacts,
             self.tile_size,
             self.scale,
         )
 
+        # The camera follows the player in the frame it moved, before the culling and the drawing
+        dx, dy = self.camera.follow(self.player, dt)
+        if dx or dy:
+            self.move_camera(dx, dy)
+        self.update_visible_objects(self.camera.xmin - (self.camera.initialValues[0] * self.tile_size[0]))
+
+    def update_enemy_batch(self, dt, size_ratio, collisions, left):
+        """
+        Same as the loop over the actors of update for the batched enemies, the enemies on screen, the dead ones and
+        the ones overlapping are found on the arrays of the EnemyBatch
+        :param left: x of the left edge of the screen in pixels
+        """
+        batch = self.enemy_batch
+        dead = batch.dead()
+        if dead.any():
+            removed = set(batch.remove(dead))
+            self.actors = [actor for actor in self.actors if actor not in removed]
+            self.actor_contacts.remove_all(removed)
+
+        batch.update_on_screen(left, left + self.canvas_size[0], self.tile_size)
+        batch.step(dt, size_ratio, collisions, self.tile_size, self.scale)
+        batch.separate(self.tile_size)
+
     def move_camera(self, dx, dy):
         self.world_origin += (dx, dy)
         self.camera.move(dx, dy)
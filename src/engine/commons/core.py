@@ -14,3 +14,13 @@ RectValue = (
     | Sequence[Number]
     | Sequence[Coordinate]
 )
+
+
+def interpolate(previous: Coordinate, current: Coordinate, alpha: float) -> Vector2:
+    """
+    Blends two simulation states for rendering
+
+    :param alpha: progress between the previous tick (0) and the current one (1)
+    :type alpha: float
+    """
+    return Vector2(previous).lerp(Vector2(current), alpha)
@@ -1,4 +1,4 @@
-from typing import Any, Protocol, Self
+from typing import Protocol, Self
 
 from pygame import Surface, Vector2
 from pygame.event import Event
@@ -8,6 +8,8 @@ from engine.commons.core import RectValue
 from engine.scene.base import BaseScene
 from engine.window.config import Config
 from engine.window.event import EventCallback, EventRegistery
+from engine.window.profiler import FrameProfiler
+from engine.window.recording import InputRecorder, InputReplay
 
 
 class Render(Protocol):
@@ -15,6 +17,8 @@ class Render(Protocol):
     dest: tuple[float, float] | Vector2
     area: RectValue | None = None
     special_flags: int = 0
+    # Areas of the screen changed by this render, None when everything changed
+    dirty_rects: list[RectValue] | None = None
 
 
 class WindowType(Protocol):
@@ -24,16 +28,29 @@ class WindowType(Protocol):
     _config: Config
     _registered_events: EventRegistery
     _should_close: bool
+    _background_drawn: bool
 
-    _record_events: bool
-    _recorded_events: dict[str, dict[str, Any]]
+    _accumulator: float
+    _alpha: float
+
+    _frame: int
+    _recorder: InputRecorder | None
+    _replay: InputReplay | None
+    _close_keys: tuple[int, ...]
+
+    _profiler: FrameProfiler
 
     active_scene: BaseScene | None
 
     def _configure_window(self) -> None: ...
+    def _filter_events(self) -> None: ...
+    def _is_close_event(self, event: Event) -> bool: ...
+    def _present(self, dirty_rects: list[RectValue] | None) -> None: ...
     def _process_events(self) -> None: ...
-    def _record_event(self, event: Event) -> None: ...
-    def _update_screen(self) -> None: ...
+    def _start_replay(self) -> None: ...
+    def _toggle_recording(self) -> None: ...
+    def _update_screen(self) -> list[RectValue] | None: ...
+    def _update_simulation(self) -> None: ...
     def _update_time(self) -> None: ...
 
     def register_event(self, event_type: int, callback: EventCallback, replace_if_exists: bool = True) -> None: ...
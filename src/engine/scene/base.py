@@ -1,7 +1,11 @@
-from typing import Protocol
+from __future__ import annotations
 
-from engine.commons.window import Render
+from typing import TYPE_CHECKING, Protocol
+
+if TYPE_CHECKING:
+    from engine.commons.window import Render
 
 
 class BaseScene(Protocol):
-    def render(self) -> Render: ...
+    def update(self, dt: float) -> None: ...
+    def render(self, alpha: float) -> Render: ...
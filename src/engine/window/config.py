@@ -18,6 +18,10 @@ class FPSTarget(IntEnum):
 @dataclass
 class WindowConfig:
     caption: str = "M2D"
+    # Present only the areas reported by the scene instead of flipping the whole screen every frame
+    dirty_rects: bool = False
+    # Block the event types no callback is registered for
+    filter_events: bool = True
     fullscreen: bool = False
     resizable: bool = False
     target_fps: FPSTarget = field(default=FPSTarget.SIXTY)
@@ -32,6 +36,40 @@ class WindowConfig:
         return 0
 
 
+@dataclass
+class SimulationConfig:
+    tick_rate: int = 60
+    # Spiral-of-death clamp, frame time above this number of ticks is dropped instead of simulated
+    max_ticks_per_frame: int = 5
+
+    @property
+    def tick_duration(self) -> float:
+        return 1 / self.tick_rate
+
+
+@dataclass
+class RecordingConfig:
+    path: str = "event_records.bin"
+    # Size of the ring buffer in bytes, it's written to the file each time it fills up
+    buffer_size: int = 1 << 16
+    # Record from the first frame instead of waiting for the toggle key
+    record_on_start: bool = False
+    # Recording fed to the window in place of the OS events
+    replay_path: str | None = None
+    close_after_replay: bool = True
+
+
+@dataclass
+class ProfilerConfig:
+    # Time the phases of the frames from the start instead of waiting for F9
+    enabled: bool = False
+    # Per frame phase times written while the export is on (F8)
+    csv_path: str = "frame_profile.csv"
+
+
 @dataclass
 class Config:
     window: WindowConfig = field(default_factory=WindowConfig)
+    simulation: SimulationConfig = field(default_factory=SimulationConfig)
+    recording: RecordingConfig = field(default_factory=RecordingConfig)
+    profiler: ProfilerConfig = field(default_factory=ProfilerConfig)
@@ -1,6 +1,6 @@
 import logging
 from dataclasses import dataclass, field
-from typing import Any, Callable, Sequence
+from typing import Any, Callable
 
 from pygame import event as ev
 
@@ -10,7 +10,7 @@ class EventCallback:
     event_name: str
     callback: Callable[[ev.Event, Any], None]
 
-    def __call__(self, *args: Sequence[Any], event: ev.Event, target: Any, **kwargs: Sequence[Any]) -> None:
+    def __call__(self, event: ev.Event, target: Any) -> None:
         self.callback(event, target)
 
     def __str__(self) -> str:
@@ -24,6 +24,9 @@ class EventCallback:
 class EventRegistery:
     __logger = logging.getLogger(__name__)
     event_callbacks: dict[int, dict[str, EventCallback]] = field(default_factory=dict)  # type: ignore
+    # Callbacks of each event type in registration order, compiled from event_callbacks when it changes so
+    # dispatching an event is a single dict lookup
+    dispatch_table: dict[int, tuple[Callable[[ev.Event, Any], None], ...]] = field(default_factory=dict)  # type: ignore
 
     def __str__(self) -> str:
         return f"EventRegistery[{len(self.event_callbacks)} events]"
@@ -31,9 +34,16 @@ class EventRegistery:
     def __repr__(self) -> str:
         return f"EventRegistery[{len(self.event_callbacks)} events]"
 
+    @property
+    def registered_types(self) -> list[int]:
+        return list(self.dispatch_table)
+
     def get_events_from_type(self, event_type: int) -> dict[str, EventCallback] | None:
         return self.event_callbacks.get(event_type)
 
+    def get_callbacks(self, event_type: int) -> tuple[Callable[[ev.Event, Any], None], ...]:
+        return self.dispatch_table.get(event_type, ())
+
     def register_event_callback(
         self, event_type: int, event_callback: EventCallback, replace_if_event_name_exists: bool = True
     ) -> None:
@@ -75,3 +85,10 @@ class EventRegistery:
                 f"Event {ev.event_name(event_type)} added to registery with event {event_callback.event_name}"
             )
             self.event_callbacks.update({event_type: {event_callback.event_name: event_callback}})
+
+        self._compile(event_type)
+
+    def _compile(self, event_type: int) -> None:
+        self.dispatch_table[event_type] = tuple(
+            event_callback.callback for event_callback in self.event_callbacks[event_type].values()
+        )
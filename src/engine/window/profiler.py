@@ -0,0 +1,194 @@
+import csv
+import time
+from typing import TextIO
+
+import numpy as np
+import pygame as pg
+
+# Phases of a frame of the engine window, in the order they happen
+FRAME_PHASES = ("time", "events", "simulation", "render", "overlay", "present")
+PHASE_COLORS = ((120, 120, 120), (240, 160, 60), (230, 80, 80), (80, 140, 230), (200, 120, 220), (80, 210, 210))
+
+# Bucket edges of the frame time histograms, in milliseconds
+HISTOGRAM_EDGES = (0, 0.25, 0.5, 1, 2, 4, 8, 16.7, 33.3, 50, 100, float("inf"))
+# Frame time of 60 fps, drawn as a line on the graph
+FRAME_BUDGET = 1000 / 60
+# Width in pixels of a bucket of the frame time histogram drawn next to the graph
+HISTOGRAM_BAR_WIDTH = 8
+
+
+class FrameProfiler:
+    def __init__(
+        self,
+        phases: tuple[str, ...] = FRAME_PHASES,
+        colors: tuple[tuple[int, int, int], ...] = PHASE_COLORS,
+        history: int = 240,
+        graph_alpha: int | None = None,
+    ) -> None:
+        """
+        Times each phase of the frames, the time since the previous lap goes to the phase given to lap so laps are
+        placed at the end of each phase. Each loop gives the names of its own phases. Frames are timed while the
+        graph is shown or the CSV export is on, otherwise laps only check a flag
+
+        :param phases: names of the phases of a frame, in the order they happen
+        :type phases: tuple[str, ...]
+        :param colors: color of each phase on the graph, reused when there are more phases than colors
+        :type colors: tuple[tuple[int, int, int], ...]
+        :param history: number of frames kept for the graph and the histograms
+        :type history: int
+        :param graph_alpha: transparency of the graph, opaque when None
+        :type graph_alpha: int | None
+        """
+        self.phases = phases
+        self.phase_index = {phase: i for i, phase in enumerate(phases)}
+        self.colors = colors
+        self.history = history
+        self.graph_alpha = graph_alpha
+        self.enabled = False
+        self.show_graph = False
+
+        # Rolling window of the phase times in ms, frame_count % history is the next row
+        self.times = np.zeros((history, len(phases)))
+        self.frame_count = 0
+        self._current = [0.0] * len(phases)
+        self._last_lap = 0.0
+
+        self._csv_file: TextIO | None = None
+        self._csv_writer = None
+
+        self._graph: pg.Surface | None = None
+        self._graph_frame = 0
+
+    def toggle(self) -> None:
+        """
+        Shows or hides the graph, the frames stay timed while the CSV export is on
+        """
+        self.show_graph = not self.show_graph
+        self._set_enabled(self.show_graph or self._csv_file is not None)
+
+    def _set_enabled(self, enabled: bool) -> None:
+        if enabled and not self.enabled:
+            self._last_lap = time.perf_counter()
+        self.enabled = enabled
+
+    def begin_frame(self) -> None:
+        if self.enabled:
+            self._last_lap = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        if self.enabled:
+            now = time.perf_counter()
+            self._current[self.phase_index[phase]] += (now - self._last_lap) * 1000
+            self._last_lap = now
+
+    def end_frame(self) -> None:
+        if not self.enabled:
+            return
+
+        self.times[self.frame_count % self.history] = self._current
+        if self._csv_writer is not None:
+            self._csv_writer.writerow([self.frame_count, *self._current, sum(self._current)])
+        self.frame_count += 1
+        self._current = [0.0] * len(self.phases)
+
+    def last_frames(self) -> np.ndarray:
+        """
+        :return: the phase times of the frames in the window, oldest first
+        """
+        if self.frame_count < self.history:
+            return self.times[: self.frame_count]
+        return np.roll(self.times, -(self.frame_count % self.history), axis=0)
+
+    def histograms(self, edges: tuple[float, ...] = HISTOGRAM_EDGES) -> dict[str, np.ndarray]:
+        """
+        :return: number of frames in each bucket of edges for each phase and for the whole frame
+        """
+        frames = self.last_frames()
+        result = {phase: np.histogram(frames[:, i], edges)[0] for i, phase in enumerate(self.phases)}
+        result["frame"] = np.histogram(frames.sum(axis=1), edges)[0]
+        return result
+
+    def start_csv(self, path: str) -> None:
+        """
+        Writes the phase times of every frame to a CSV file until stop_csv, the frames are timed even if the graph
+        is hidden
+        """
+        self.stop_csv()
+        self._csv_file = open(path, "w", newline="")  # noqa: SIM115 - kept open while exporting
+        self._csv_writer = csv.writer(self._csv_file)
+        self._csv_writer.writerow(["frame", *self.phases, "total"])
+        self._set_enabled(True)
+
+    def stop_csv(self) -> None:
+        if self._csv_file is not None:
+            self._csv_file.close()
+        self._csv_file = None
+        self._csv_writer = None
+        self._set_enabled(self.show_graph)
+
+    def toggle_csv(self, path: str) -> None:
+        if self._csv_file is None:
+            self.start_csv(path)
+        else:
+            self.stop_csv()
+
+    def draw(
+        self, screen: pg.Surface, pos: tuple[int, int] = (10, 10), size: tuple[int, int] = (360, 120), scale: int = 2
+    ) -> pg.Rect:
+        """
+        Draws the last frames as stacked bars, one color per phase, with the line of the 60 fps budget and the
+        histogram of the frame times on its right. The surface of the graph scrolls and only the frames ended
+        since the last draw are added to it
+
+        :param scale: height in pixels of a millisecond
+        :type scale: int
+        :return: the area of the screen drawn
+        """
+        x, y = pos
+        width, height = size
+        if self._graph is None or self._graph.get_size() != tuple(size):
+            self._graph = pg.Surface(size)
+            if self.graph_alpha is not None:
+                self._graph.set_alpha(self.graph_alpha)
+            self._graph_frame = self.frame_count - width
+
+        frames = self.last_frames()
+        new = min(self.frame_count - self._graph_frame, width, len(frames))
+        self._graph.scroll(-new, 0)
+        self._graph.fill((0, 0, 0), (width - new, 0, new, height))
+        tops = np.cumsum(frames[len(frames) - new :], axis=1) * scale
+        for column in range(new):
+            bottom = 0
+            for i in range(len(self.phases)):
+                top = int(tops[column, i])
+                if top > bottom:
+                    pg.draw.line(
+                        self._graph,
+                        self.colors[i % len(self.colors)],
+                        (width - new + column, height - bottom - 1),
+                        (width - new + column, height - top),
+                    )
+                bottom = top
+        self._graph_frame = self.frame_count
+
+        area = screen.blit(self._graph, pos)
+        budget = y + height - int(FRAME_BUDGET * scale)
+        pg.draw.line(screen, (255, 255, 255), (x, budget), (x + width - 1, budget))
+        return area.union(self.draw_histogram(screen, (x + width + 4, y), height))
+
+    def draw_histogram(self, screen: pg.Surface, pos: tuple[int, int], height: int) -> pg.Rect:
+        """
+        Draws one bar per bucket of HISTOGRAM_EDGES with the number of frames of the window in it, the buckets over
+        the 60 fps budget are red
+
+        :return: the area of the screen drawn
+        """
+        x, y = pos
+        counts = self.histograms()["frame"]
+        area = screen.fill((0, 0, 0), (x, y, len(counts) * HISTOGRAM_BAR_WIDTH, height))
+        most = max(int(counts.max()), 1) if len(counts) else 1
+        for i, count in enumerate(counts.tolist()):
+            bar = count * height // most
+            color = (230, 80, 80) if HISTOGRAM_EDGES[i] >= FRAME_BUDGET else (90, 170, 90)
+            screen.fill(color, (x + i * HISTOGRAM_BAR_WIDTH, y + height - bar, HISTOGRAM_BAR_WIDTH - 1, bar))
+        return area
@@ -0,0 +1,169 @@
+import logging
+import marshal
+import struct
+from collections import defaultdict
+from typing import Any, BinaryIO
+
+from pygame import NOEVENT
+from pygame import event as ev
+
+# Recording layout (little endian) :
+# header    magic "M2DI", version (u16), tick rate of the simulation (u16)
+# records   frame index (u32), event type (u32), payload size (u16), payload
+#           the payload is the marshalled event dict, or the frame time (f64) for FRAME_TIME records
+RECORDING_MAGIC = b"M2DI"
+RECORDING_VERSION = 1
+HEADER = struct.Struct("<4sHH")
+RECORD = struct.Struct("<IIH")
+FRAME_TIME = struct.Struct("<d")
+# NOEVENT is never returned by the event queue so it marks the records holding the time of a frame
+FRAME_TIME_RECORD = NOEVENT
+MARSHAL_VERSION = 4
+
+
+def encode_event_dict(event_dict: dict[str, Any]) -> bytes:
+    """
+    Values marshal can't write (window objects...) are left out of the recording
+    """
+    try:
+        return marshal.dumps(event_dict, MARSHAL_VERSION)
+    except ValueError:
+        kept = {}
+        for key, value in event_dict.items():
+            try:
+                marshal.dumps(value, MARSHAL_VERSION)
+            except ValueError:
+                continue
+            kept[key] = value
+        return marshal.dumps(kept, MARSHAL_VERSION)
+
+
+class RingBuffer:
+    def __init__(self, capacity: int) -> None:
+        """
+        Fixed size byte buffer written at the head and drained from the tail, nothing is allocated per write
+
+        :param capacity: size of the buffer in bytes
+        :type capacity: int
+        """
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def free(self) -> int:
+        return self.capacity - self._size
+
+    def write(self, data: bytes) -> None:
+        if len(data) > self.free():
+            raise BufferError(f"{len(data)} bytes written in a ring buffer with {self.free()} bytes free")
+
+        start = (self._head + self._size) % self.capacity
+        first = min(len(data), self.capacity - start)
+        self._view[start : start + first] = data[:first]
+        self._view[: len(data) - first] = data[first:]
+        self._size += len(data)
+
+    def drain(self, stream: BinaryIO) -> None:
+        """
+        Writes the content of the buffer to the stream and empties it
+        """
+        first = min(self._size, self.capacity - self._head)
+        stream.write(self._view[self._head : self._head + first])
+        stream.write(self._view[: self._size - first])
+        self._head = (self._head + self._size) % self.capacity
+        self._size = 0
+
+
+class InputRecorder:
+    __logger = logging.getLogger(__name__)
+
+    def __init__(self, path: str, tick_rate: int, buffer_size: int = 1 << 16) -> None:
+        """
+        Appends every event with the index of its frame to a ring buffer streamed to the file when it fills up
+
+        :param tick_rate: tick rate of the simulation, replays are only deterministic with the same one
+        :type tick_rate: int
+        :param buffer_size: size of the ring buffer in bytes
+        :type buffer_size: int
+        """
+        self.path = path
+        self._buffer = RingBuffer(buffer_size)
+        self._file = open(path, "wb")  # noqa: SIM115 - kept open while recording
+        self._file.write(HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, tick_rate))
+        self.records = 0
+        self.__logger.debug("Recording inputs to %s", path)
+
+    def _write(self, frame: int, event_type: int, payload: bytes) -> None:
+        size = RECORD.size + len(payload)
+        if size > self._buffer.free():
+            self._buffer.drain(self._file)
+        if size > self._buffer.capacity:
+            raise BufferError(f"Record of {size} bytes larger than the recording buffer")
+
+        self._buffer.write(RECORD.pack(frame, event_type, len(payload)))
+        self._buffer.write(payload)
+        self.records += 1
+
+    def record_event(self, frame: int, event: ev.Event) -> None:
+        self._write(frame, event.type, encode_event_dict(event.dict))
+
+    def record_frame_time(self, frame: int, frame_time: float) -> None:
+        self._write(frame, FRAME_TIME_RECORD, FRAME_TIME.pack(frame_time))
+
+    def flush(self) -> None:
+        self._buffer.drain(self._file)
+        self._file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+        self.__logger.debug("Recorded %d records to %s", self.records, self.path)
+
+
+class InputReplay:
+    def __init__(self, path: str) -> None:
+        """
+        Reads a recording made by InputRecorder to feed its events and frame times back frame by frame
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+
+        magic, version, self.tick_rate = HEADER.unpack_from(data, 0)
+        if magic != RECORDING_MAGIC:
+            raise ValueError(f"{path} is not an input recording")
+        if version != RECORDING_VERSION:
+            raise ValueError(f"{path} has version {version}, expected {RECORDING_VERSION}")
+
+        self._events: dict[int, list[ev.Event]] = defaultdict(list)
+        self._frame_times: dict[int, float] = {}
+        self.last_frame = -1
+
+        offset = HEADER.size
+        while offset < len(data):
+            frame, event_type, size = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            payload = data[offset : offset + size]
+            offset += size
+
+            if event_type == FRAME_TIME_RECORD:
+                self._frame_times[frame] = FRAME_TIME.unpack(payload)[0]
+            else:
+                self._events[frame].append(ev.Event(event_type, marshal.loads(payload)))
+            self.last_frame = max(self.last_frame, frame)
+
+    def events(self, frame: int) -> list[ev.Event]:
+        return self._events.get(frame, [])
+
+    def frame_time(self, frame: int) -> float | None:
+        """
+        :return: the time the recorded frame took, None if it wasn't recorded
+        """
+        return self._frame_times.get(frame)
+
+    def finished(self, frame: int) -> bool:
+        return frame > self.last_frame
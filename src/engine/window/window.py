@@ -1,13 +1,16 @@
-import json
 import logging
+import os
 from typing import Self
 
 import pygame as pg
 
+from engine.commons.core import RectValue
 from engine.commons.window import WindowType
 
 from .config import Config
 from .event import EventCallback, EventRegistery
+from .profiler import FrameProfiler
+from .recording import InputRecorder, InputReplay
 
 
 class Window(WindowType):
@@ -17,9 +20,24 @@ class Window(WindowType):
 
     _registered_events: EventRegistery = EventRegistery()
     _should_close = False
+    _background_drawn = False
 
-    _record_events = False
-    _recorded_events = {}
+    # Time not simulated yet and progress towards the next tick used to interpolate rendering
+    _accumulator = 0.0
+    _alpha = 0.0
+
+    # Index of the current frame, used to record and replay the events
+    _frame = 0
+    # Time simulated by the current frame once _update_time ran, None before
+    _frame_time: float | None = None
+    _recorder: InputRecorder | None = None
+    # Frame the recording started on, frames are recorded relative to it so replays start on frame 0
+    _recording_start = 0
+    _replay: InputReplay | None = None
+    # Keys closing the window, still read from the OS while replaying
+    _close_keys = (pg.K_ESCAPE,)
+
+    _profiler = FrameProfiler()
 
     active_scene = None
 
@@ -37,64 +55,189 @@ class Window(WindowType):
             window._should_close = True
 
         def window_close_keyboard(event: pg.event.Event, window: WindowType) -> None:
-            if (key := event.dict.get("key")) and (key == pg.K_ESCAPE):
+            if (key := event.dict.get("key")) and (key in window._close_keys):
                 window._should_close = True
 
         def toggle_recording(event: pg.event.Event, window: WindowType) -> None:
             if (key := event.dict.get("key")) and (key == pg.K_r):
-                window._record_events = not window._record_events
-                self.__logger.debug(f"{'Started' if window._record_events else 'Stopped'} recording events")
+                window._toggle_recording()
+
+        def toggle_profiler(event: pg.event.Event, window: WindowType) -> None:
+            if (key := event.dict.get("key")) and (key == pg.K_F9):
+                window._profiler.toggle()
+            elif key == pg.K_F8:
+                window._profiler.toggle_csv(window._config.profiler.csv_path)
 
         self.register_event(pg.QUIT, EventCallback("set_should_close_to_true", window_close))
         self.register_event(pg.KEYDOWN, EventCallback("set_should_close_to_true", window_close_keyboard))
         self.register_event(pg.KEYDOWN, EventCallback("toggle_event_recording", toggle_recording))
+        self.register_event(pg.KEYDOWN, EventCallback("toggle_profiler", toggle_profiler))
+        self._filter_events()
+
+    def _filter_events(self) -> None:
+        """
+        Lets only the registered event types into the queue so unused ones (mouse motion floods...) never reach
+        _process_events, applied once the window is opened
+        """
+        if pg.display.get_surface() is None or not self._config.window.filter_events:
+            return
+
+        pg.event.set_blocked(None)
+        pg.event.set_allowed(self._registered_events.registered_types)
 
     def _process_events(self) -> None:
-        events = pg.event.get()
+        if self._replay is not None:
+            # Only the recorded events reach the callbacks, the OS events are dropped except the ones closing the
+            # window so it can still be closed during a replay
+            events = [*self._replay.events(self._frame), *filter(self._is_close_event, pg.event.get())]
+            if self._replay.finished(self._frame):
+                # Live input comes back once the recording ran out
+                self._replay = None
+                if self._config.recording.close_after_replay:
+                    self._should_close = True
+        else:
+            events = pg.event.get()
+
+        dispatch_table = self._registered_events.dispatch_table
+        debug = self.__logger.isEnabledFor(logging.DEBUG)
         for event in events:
-            self.__logger.debug(f"Event {pg.event.event_name(event.type)} : {event.dict}")
-            if self._record_events:
-                self._record_event(event)
-            if event_callbacks := self._registered_events.get_events_from_type(event.type):
-                for callback_name in event_callbacks:
-                    self.__logger.debug(f"Event {callback_name} called from event {pg.event.event_name(event.type)}")
-                    event_callbacks[callback_name](event=event, window=self)
-
-    def _record_event(self, event: pg.event.Event) -> None:
-        event_name = pg.event.event_name(event.type)
-        if event_name not in self._recorded_events.keys():
-            self._recorded_events.update({event_name: event.dict})
-
-    def _update_screen(self) -> None:
+            if debug:
+                self.__logger.debug("Event %s : %s", pg.event.event_name(event.type), event.dict)
+            if self._recorder is not None:
+                self._recorder.record_event(self._frame - self._recording_start, event)
+            for callback in dispatch_table.get(event.type, ()):
+                callback(event, self)
+
+    def _is_close_event(self, event: pg.event.Event) -> bool:
+        return event.type == pg.QUIT or (event.type == pg.KEYDOWN and event.dict.get("key") in self._close_keys)
+
+    def _present(self, dirty_rects: list[RectValue] | None) -> None:
+        if not self._config.window.dirty_rects or dirty_rects is None:
+            pg.display.flip()
+        elif dirty_rects:
+            pg.display.update(dirty_rects)
+
+    def _start_replay(self) -> None:
+        self._replay = InputReplay(self._config.recording.replay_path)
+        if self._replay.tick_rate != self._config.simulation.tick_rate:
+            self.__logger.warning(
+                "Replaying a recording made at %d ticks per second with %d, it won't be deterministic",
+                self._replay.tick_rate,
+                self._config.simulation.tick_rate,
+            )
+
+    def _toggle_recording(self) -> None:
+        if self._recorder is None:
+            # The replayed events would toggle the recording again and could overwrite the file being replayed
+            if self._replay is not None:
+                self.__logger.warning("Recording is disabled while replaying")
+                return
+            path = self._config.recording.path
+            replay_path = self._config.recording.replay_path
+            if replay_path is not None and os.path.abspath(path) == os.path.abspath(replay_path):
+                self.__logger.warning("Refusing to record to %s, it's the recording to replay", path)
+                return
+
+            self._recorder = InputRecorder(path, self._config.simulation.tick_rate, self._config.recording.buffer_size)
+            self._recording_start = self._frame
+            # Started after _update_time, the time of the current frame is recorded here and the time left from the
+            # previous frames is dropped, replays start with only that frame's time in the accumulator too
+            if self._frame_time is not None:
+                self._recorder.record_frame_time(0, self._frame_time)
+                self._accumulator = self._frame_time
+        else:
+            self._recorder.close()
+            self._recorder = None
+
+    def _update_screen(self) -> list[RectValue] | None:
+        """
+        :return: the areas of the screen that changed, None when the whole screen changed
+        """
         if self.active_scene:
-            render = self.active_scene.render()
+            render = self.active_scene.render(self._alpha)
             self._screen.blit(
                 source=render.source, dest=render.dest, area=render.area, special_flags=render.special_flags
             )
-            return
+            self._background_drawn = False
+            return render.dirty_rects
+
+        if self._background_drawn and self._config.window.dirty_rects:
+            return []
 
         self._screen.fill(pg.Color(50, 50, 50))
+        self._background_drawn = True
+        return None
+
+    def _update_simulation(self) -> None:
+        """
+        Runs as many fixed ticks as the elapsed time allows so the simulation doesn't depend on the framerate
+        """
+        tick_duration = self._config.simulation.tick_duration
+        ticks = 0
+        while self._accumulator >= tick_duration:
+            if ticks == self._config.simulation.max_ticks_per_frame:
+                self.__logger.debug(f"Dropped {self._accumulator:.4f}s of simulation after {ticks} ticks")
+                self._accumulator = 0.0
+                break
+            if self.active_scene:
+                self.active_scene.update(tick_duration)
+            self._accumulator -= tick_duration
+            ticks += 1
+
+        self._alpha = self._accumulator / tick_duration
 
     def _update_time(self) -> None:
-        self._clock.tick(self._config.window.target_fps.value)
+        frame_time = self._clock.tick(self._config.window.target_fps.value) / 1000
+        # Replays simulate the recorded frame times so they run the same ticks as the recorded session
+        if self._replay is not None and (recorded_time := self._replay.frame_time(self._frame)) is not None:
+            frame_time = recorded_time
+        if self._recorder is not None:
+            self._recorder.record_frame_time(self._frame - self._recording_start, frame_time)
+        self._frame_time = frame_time
+        self._accumulator += frame_time
 
     def register_event(self, event_type: int, callback: EventCallback, replace_if_exists: bool = True) -> None:
         self.__logger.debug(f"Registering event {event_type} with callback {callback}")
         self._registered_events.register_event_callback(
             event_type=event_type, event_callback=callback, replace_if_event_name_exists=replace_if_exists
         )
+        self._filter_events()
 
     def run(self) -> None:
         self._configure_window()
+        if self._config.recording.replay_path is not None:
+            self._start_replay()
+        if self._config.recording.record_on_start:
+            self._toggle_recording()
+
+        if self._config.profiler.enabled:
+            self._profiler.toggle()
+
+        profiler = self._profiler
         while not self._should_close:
+            profiler.begin_frame()
             self._update_time()
-            self._update_screen()
+            profiler.lap("time")
             self._process_events()
-            pg.display.flip()
-
-        if self._recorded_events:
-            with open("event_records.txt", "+w") as f:
-                json.dump(self._recorded_events, f)
+            profiler.lap("events")
+            self._update_simulation()
+            profiler.lap("simulation")
+            dirty_rects = self._update_screen()
+            profiler.lap("render")
+            if profiler.show_graph:
+                graph = profiler.draw(self._screen)
+                if dirty_rects is not None:
+                    dirty_rects = [*dirty_rects, graph]
+            profiler.lap("overlay")
+            self._present(dirty_rects)
+            profiler.lap("present")
+            profiler.end_frame()
+            self._frame += 1
+            self._frame_time = None
+
+        if self._recorder is not None:
+            self._toggle_recording()
+        profiler.stop_csv()
 
     def set_config(self, config: Config) -> Self:
         self._config = config